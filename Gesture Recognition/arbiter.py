@@ -0,0 +1,307 @@
+"""
+Date: 21.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - One entry for the velocity intents of all input sources: gestures, keyboard and mission scripts
+    - Every source has a priority and a timeout (config.INPUT_SOURCES);
+      the active source with the highest priority is flown, an expired intent no longer counts
+    - Event-driven: a new intent, a released key or an expired source reaches the MotionCommander
+      from the thread where it happened, without a polling loop
+    - Keyboard source with pynput (keys of POC mc_with_keyboard.py) and mission source (mission.py)
+    - Only the keyboard source is part of the flight (config.INPUT_KEYBOARD); the gesture loop submits
+      an intent every frame, so a lower priority mission never wins there. Missions in flight are flown
+      by the autopilot (config.AUTONOMOUS = "mission"), the mission source is used by the latency check below
+
+If executed directly, it will:
+    - Fly a mission on the simulator, override it with keyboard intents
+      and print the latency from an override to its setpoint packet
+"""
+
+import time
+import random
+import threading
+import statistics
+
+import config
+import control
+import mission
+
+
+class InputArbiter:
+    """
+    Stand-in for the MotionCommander in front of the radio.
+    Commands of the DroneController count as source "gesture".
+    Unknown attributes are forwarded to the MotionCommander.
+    """
+
+    def __init__(self, mc, sources=None, clock=control.CLOCK):
+        self._mc = mc
+        self.sources = dict(config.INPUT_SOURCES if sources is None else sources)
+        self.clock = clock
+        self.intents = {} # source: (velocities, time)
+        self.active = None # source that was forwarded last
+        self.closed = False
+        self.counts = {name: 0 for name in self.sources} # forwarded commands per source
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="input arbiter", daemon=True)
+        self.thread.start()
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Gesture intent.
+        """
+
+        self.submit("gesture", (velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw))
+
+    def stop(self):
+        """
+        Gesture intent to hover.
+        """
+
+        self.submit("gesture", (0.0, 0.0, 0.0, 0.0))
+
+    def submit(self, source, velocities, now=None):
+        """
+        Sets the intent (vx, vy, vz, yaw rate) of a source, None releases it.
+        Forwards it right away if the source is the one with the highest priority.
+        """
+
+        with self.condition:
+            if self.closed:
+                return
+            now = self.clock.now() if now is None else now
+            if velocities is None:
+                self.intents.pop(source, None)
+            else:
+                self.intents[source] = (velocities, now)
+            self._dispatch(now, source)
+            self.condition.notify() # the thread plans the next expiry
+
+    def _expired(self, source, now):
+        timeout = self.sources[source][1]
+        return timeout is not None and now - self.intents[source][1] >= timeout
+
+    def _winner(self, now):
+        active = [source for source in self.intents if not self._expired(source, now)]
+        return max(active, key=lambda source: self.sources[source][0], default=None)
+
+    def _dispatch(self, now, changed=None):
+        winner = self._winner(now)
+        if winner is None:
+            if self.active is not None:
+                self._mc.stop() # nobody in control → hover
+                self.active = None
+        elif winner != self.active or winner == changed:
+            *velocities, rate_yaw = self.intents[winner][0]
+            self._mc.start_linear_motion(*velocities, rate_yaw=rate_yaw)
+            self.counts[winner] += 1
+            if winner != self.active:
+                print(f"🕹️ Input: {winner}")
+            self.active = winner
+
+    def _run(self):
+        with self.condition:
+            while not self.closed:
+                now = self.clock.now()
+                expiries = [
+                    self.intents[source][1] + self.sources[source][1]
+                    for source in self.intents
+                    if self.sources[source][1] is not None and not self._expired(source, now)
+                ]
+                if self.active is not None and self._expired(self.active, now):
+                    self._dispatch(now)
+                self.condition.wait(max(0.0, min(expiries) - now) if expiries else None)
+
+    def close(self):
+        """
+        Ignores all further intents (before the MotionCommander lands) and prints the counters.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        print("🕹️ Inputs: " + ", ".join(f"{count} {source}" for source, count in self.counts.items()))
+
+    def __getattr__(self, name):
+        return getattr(self._mc, name)
+
+
+class KeyboardSource:
+    """
+    Keyboard intents with pynput (optional dependency, only needed if used).
+    Arrow keys fly forward/back and turn, w/s go up/down, esc calls on_quit.
+    """
+
+    def __init__(self, arbiter, on_quit=None):
+        from pynput import keyboard
+
+        self.arbiter = arbiter
+        self.on_quit = on_quit
+        self.special_keys = {
+            keyboard.Key.esc: "esc",
+            keyboard.Key.up: "forward",
+            keyboard.Key.down: "backward",
+            keyboard.Key.left: "left",
+            keyboard.Key.right: "right"
+        }
+        self.char_keys = {"w": "up", "s": "down"}
+        self.pressed_keys = set()
+        self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+
+    def start(self):
+        """
+        Starts listening.
+        """
+
+        self.listener.start()
+
+    def stop(self):
+        """
+        Stops listening.
+        """
+
+        self.listener.stop()
+
+    def _name(self, key):
+        if hasattr(key, "char") and key.char in self.char_keys:
+            return self.char_keys[key.char]
+        return self.special_keys.get(key)
+
+    def on_press(self, key):
+        """
+        Handles key press events (called by the pynput thread).
+        """
+
+        name = self._name(key)
+        if name == "esc":
+            if self.on_quit is not None:
+                self.on_quit()
+        elif name is not None and name not in self.pressed_keys:
+            self.pressed_keys.add(name)
+            self.arbiter.submit("keyboard", self.velocities())
+
+    def on_release(self, key):
+        """
+        Handles key release events (called by the pynput thread).
+        """
+
+        name = self._name(key)
+        if name in self.pressed_keys:
+            self.pressed_keys.discard(name)
+            self.arbiter.submit("keyboard", self.velocities() if self.pressed_keys else None)
+
+    def velocities(self):
+        """
+        Returns the intent of the pressed keys (same velocities as the gestures).
+        """
+
+        pressed = self.pressed_keys
+        v_til = config.VT * (("forward" in pressed) - ("backward" in pressed))
+        v_alt = config.VA * (("up" in pressed) - ("down" in pressed))
+        v_yaw = config.VY * (("left" in pressed) - ("right" in pressed))
+        return (v_til, 0.0, v_alt, v_yaw)
+
+
+class MissionSource:
+    """
+    Flies a compiled mission (mission.Mission) as intents of source "mission" on its own thread.
+    Not wired into the flight, see the module docstring.
+    """
+
+    def __init__(self, arbiter, flight, period=config.SETPOINT_PERIOD, clock=control.CLOCK):
+        self.arbiter = arbiter
+        self.flight = flight
+        self.period = period
+        self.clock = clock
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="mission source", daemon=True)
+
+    def start(self):
+        """
+        Starts the mission.
+        """
+
+        self.thread.start()
+
+    def stop(self):
+        """
+        Ends the mission early.
+        """
+
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        start = self.clock.now()
+        while not self.stopped.is_set():
+            t = self.clock.now() - start
+            if t > self.flight.duration:
+                break
+            self.arbiter.submit("mission", self.flight.body_velocity(t))
+            self.stopped.wait(self.period)
+        self.arbiter.submit("mission", None)
+
+
+def override_latency(overrides=20):
+    """
+    Flies mission.ROUTE on the simulator and overrides it with keyboard intents at random times.
+    Returns the latencies from every override to its setpoint packet.
+    """
+
+    import commands
+    import simulator
+
+    cf = simulator.SimulatedCrazyflie()
+    latencies = []
+    with commands.DirectCommander(cf, default_height=config.DEFAULT_HEIGHT) as mc:
+        command_filter = commands.CommandFilter(mc)
+        arbiter = InputArbiter(command_filter)
+        source = MissionSource(arbiter, mission.Mission(mission.ROUTE))
+        source.start()
+        try:
+            for i in range(overrides):
+                time.sleep(random.uniform(0.05, 0.2))
+                vx = (i + 1) / 100 # distinct velocity to find the matching packet
+                start = len(cf.packets)
+                sent = time.perf_counter()
+                arbiter.submit("keyboard", (vx, 0.0, 0.0, 0.0))
+
+                arrival = None
+                while arrival is None and time.perf_counter() - sent < 1.0:
+                    for stamp, _, setpoint in cf.hover_setpoints(start):
+                        if abs(setpoint[0] - vx) < 1e-6:
+                            arrival = stamp
+                            break
+                    else:
+                        time.sleep(0.0005)
+                if arrival is not None:
+                    latencies.append(arrival - sent)
+                time.sleep(random.uniform(0.05, 0.2))
+                arbiter.submit("keyboard", None) # back to the mission
+        finally:
+            source.stop()
+            arbiter.close()
+            command_filter.close()
+    return latencies
+
+
+def main():
+    """
+    Prints the keyboard override latency on the simulator.
+    """
+
+    latencies = override_latency()
+    if not latencies:
+        print("❌ No override reached the radio")
+        return
+    latencies.sort()
+    print(
+        f"⌨️ Keyboard override to radio ({len(latencies)} overrides, simulator): "
+        f"mean {statistics.mean(latencies) * 1000:.3f} ms, max {latencies[-1] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Date: 20.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Control mode switch of POC aruco_scan_multiple.py in the gesture loop
+    - Live control while tag 0 (config.LIVE_TAG) or all hand tags are detected
+    - Once they are gone for config.MODE_TIMEOUT, the autonomous behaviour (config.AUTONOMOUS) takes over:
+        - "hover": hovers in place
+        - "return": retraces the commands flown since take off back to the take off point
+        - "mission": flies mission.ROUTE (velocities of the compiled trajectory)
+    - Uses the detection result of the frame, no extra detection
+"""
+
+import cv2
+
+import config
+import mission
+import vision
+
+
+BEHAVIOURS = ["hover", "return", "mission"]
+aliases = {
+    "auto": "### AUTONOMOUS FLIGHT ###",
+    "live": "### LIVE CONTROL ###",
+}
+
+
+class Autopilot:
+    """
+    Decides for every frame between the gesture direction and the autonomous behaviour.
+    Directions are (v_til, v_alt, v_yaw) like the ones of the evaluators.
+    """
+
+    def __init__(self, behaviour=config.AUTONOMOUS, timeout=config.MODE_TIMEOUT, steps=None):
+        if behaviour not in BEHAVIOURS:
+            raise ValueError(f"Unknown autonomous behaviour {behaviour}")
+
+        self.behaviour = behaviour
+        self.timeout = timeout
+        self.mode = "live"
+        self.last_live = None
+        self.auto_start = None
+        self.last_time = None
+        self.direction = (0, 0, 0) # direction sent since last_time
+        self.returning = False # direction is a retraced one
+        self.path = [] # [direction, seconds] flown since take off, for "return"
+        self.mission = None
+        if behaviour == "mission": # compiled before the flight
+            self.mission = mission.Mission(mission.ROUTE if steps is None else steps)
+            if any(name in ("left", "right") for name, *_ in self.mission.steps):
+                raise ValueError("The gesture controller cannot fly sideways mission steps")
+
+    def reset(self, now):
+        """
+        Starts in live mode (the hand is in place after the calibration).
+        """
+
+        self.mode = "live"
+        self.last_live = now
+        self.last_time = now
+
+    def live(self, ids, valid):
+        """
+        Returns True if the frame allows live control: tag 0 detected or all hand tags complete.
+        """
+
+        return valid or (ids is not None and config.LIVE_TAG in ids)
+
+    def step(self, live, direction, now):
+        """
+        Returns the direction to send for the frame captured at now.
+        """
+
+        self._log(now)
+        if live:
+            self.last_live = now
+            if self.mode != "live":
+                print("🎮 Live control")
+                self.mode = "live"
+            result = direction
+        elif now - self.last_live < self.timeout:
+            result = (0, 0, 0)
+        else:
+            if self.mode != "auto":
+                print(f"🤖 Autonomous flight ({self.behaviour})")
+                self.mode = "auto"
+                self.auto_start = now
+            result = self._autonomous(now)
+
+        self.direction = result
+        return result
+
+    @property
+    def active(self):
+        """
+        True while an autonomous behaviour is still flying (the safety timer waits for it).
+        """
+
+        if self.mode != "auto" or self.behaviour == "hover":
+            return False
+        if self.behaviour == "return":
+            return bool(self.path)
+        return self.last_time - self.auto_start < self.mission.duration
+
+    def _log(self, now):
+        if self.last_time is None:
+            self.last_time = now
+        seconds = now - self.last_time
+        self.last_time = now
+        if self.returning:
+            self._retrace(seconds)
+        elif seconds > 0 and any(self.direction):
+            if self.path and self.path[-1][0] == self.direction:
+                self.path[-1][1] += seconds
+            else:
+                self.path.append([self.direction, seconds])
+        self.returning = False
+
+    def _retrace(self, seconds):
+        while seconds > 0 and self.path:
+            used = min(seconds, self.path[-1][1])
+            self.path[-1][1] -= used
+            seconds -= used
+            if self.path[-1][1] <= 1e-9:
+                self.path.pop()
+
+    def _autonomous(self, now):
+        if self.behaviour == "return" and self.path:
+            self.returning = True
+            return tuple(-v for v in self.path[-1][0])
+
+        if self.behaviour == "mission":
+            v_til, _, v_alt, v_yaw = self.mission.body_velocity(now - self.auto_start)
+            return (v_til, v_alt, v_yaw)
+
+        return (0, 0, 0)
+
+
+def draw_mode(frame, mode):
+    """
+    Draws the control mode onto a mirrored copy of the frame.
+    Returns it unmirrored again, like vision.draw_text().
+    """
+
+    flipped_frame = cv2.flip(frame, 1)
+    text = aliases[mode]
+    (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1, 2)
+    pos_x = (flipped_frame.shape[1] - text_w) // 2
+    cv2.putText(flipped_frame, text, (pos_x, text_h + 10), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    return cv2.flip(flipped_frame, 1)
@@ -0,0 +1,103 @@
+"""
+Date: 22.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Battery supervision of POC test_battery.py inside the gesture control
+    - Subscribes to pm.batteryLevel through the TelemetryRecorder (same LogConfig packing as the other variables)
+    - Scales all velocities down below config.BATTERY_SLOW and lands below config.BATTERY_LAND
+    - Runs on the cflib log thread with a few arithmetic operations, nothing blocks the vision loop
+"""
+
+import config
+
+
+BATTERY_VARIABLE = ("pm.batteryLevel", "uint8_t")
+
+
+class BatterySupervisor:
+    """
+    Stand-in for the MotionCommander that scales the velocities of every input source with the battery level.
+    Unknown attributes are forwarded to the MotionCommander.
+    """
+
+    def __init__(self, mc, controller, slow=config.BATTERY_SLOW, land=config.BATTERY_LAND,
+                 min_scale=config.BATTERY_MIN_SCALE, smoothing=config.BATTERY_SMOOTHING, step=config.BATTERY_SCALE_STEP):
+        self._mc = mc
+        self.controller = controller
+        self.slow_level = slow
+        self.land_level = land
+        self.min_scale = min_scale
+        self.smoothing = smoothing
+        self.step = step
+        self.level = None # smoothed battery level in %
+        self.lowest = None
+        self.scale = 1.0
+        self.landing = False
+        self.telemetry = None
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Forwards the motion with the velocities scaled to the battery level.
+        """
+
+        scale = self.scale
+        self._mc.start_linear_motion(
+            velocity_x_m * scale, velocity_y_m * scale, velocity_z_m * scale, rate_yaw=rate_yaw * scale)
+
+    def on_log(self, _, data):
+        """
+        Telemetry callback (cflib thread): updates the level, the velocity scale and lands if needed.
+        """
+
+        sample = data.get(BATTERY_VARIABLE[0])
+        if sample is None:
+            return
+
+        # the level sags under load, so single samples must not trigger the landing
+        self.level = sample if self.level is None else self.level + (sample - self.level) * self.smoothing
+        self.lowest = self.level if self.lowest is None else min(self.lowest, self.level)
+
+        share = (self.level - self.land_level) / (self.slow_level - self.land_level)
+        scale = min(1.0, self.min_scale + (1.0 - self.min_scale) * max(0.0, share))
+        scale = max(self.min_scale, round(round(scale / self.step) * self.step, 6)) # unchanged between steps (CommandFilter dedup)
+        if scale < 1.0 and self.scale == 1.0:
+            print(f"🔋 Battery at {self.level:.0f}% → velocities scaled down")
+        self.scale = scale
+
+        if self.level <= self.land_level and not self.landing:
+            print(f"🪫 Battery at {self.level:.0f}% → landing")
+            self.landing = True
+            self.controller.request_land()
+
+    def start(self, scf, flight_recorder=None):
+        """
+        Starts the telemetry (config.TELEMETRY_VARIABLES, the battery level added if missing).
+        The telemetry recorder can be shared with the asyncio runtime.
+        """
+
+        import telemetry
+
+        variables = list(config.TELEMETRY_VARIABLES)
+        if BATTERY_VARIABLE[0] not in [name for name, _ in variables]:
+            variables.append(BATTERY_VARIABLE)
+        self.telemetry = telemetry.TelemetryRecorder(
+            variables, path=config.TELEMETRY_DIR, period=config.TELEMETRY_PERIOD)
+        self.telemetry.add_callback(self.on_log)
+        if flight_recorder is not None:
+            flight_recorder.attach(self.telemetry)
+        self.telemetry.start(scf)
+
+    def stop(self):
+        """
+        Stops the telemetry and prints the lowest battery level.
+        """
+
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.lowest is not None:
+            print(f"🔋 Battery: lowest {self.lowest:.0f}%, velocity scale {self.scale:.2f}")
+
+    def __getattr__(self, name):
+        return getattr(self._mc, name)
@@ -0,0 +1,239 @@
+"""
+Date: 13.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Benchmarks the hot paths of the gesture loop on synthetic aruco frames (480p, 720p, 1080p)
+      with all tags and with one tag missing:
+      Camera.process_frame, TagEvaluater.update, _shoelace_formula and the drawing of show_feed
+    - Runs headless (no camera, no radio, no window)
+    - Compares the results with a JSON baseline and fails if a path got slower than the threshold
+      (the first run on a machine writes the baseline)
+
+If executed directly, it will:
+    - Run all benchmarks and compare them with the baseline (--update stores a new baseline,
+      without a baseline file the results become the baseline)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import cv2
+import numpy as np
+
+import config
+import palm
+import vision
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+THRESHOLD = 0.2 # allowed slowdown against the baseline
+REPEAT = 50 # measurements per benchmark (the median is used)
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080)
+}
+CASES = {
+    "all": config.USED_TAGS,
+    "missing": config.USED_TAGS[:-1]
+}
+
+
+class SyntheticCapture:
+    """
+    Stand-in for cv2.VideoCapture that returns the same frame over and over.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def read(self, out=None):
+        """
+        Returns a copy of the frame like VideoCapture.read().
+        """
+
+        if out is None:
+            return True, self.frame.copy()
+        out[...] = self.frame
+        return True, out
+
+    def release(self):
+        """
+        Nothing to release.
+        """
+
+
+def layout(width, height):
+    """
+    Returns the tag size and the top left corner of every tag in the palm layout
+    (1 top left, 2 top right, 3 bottom right, 4 bottom left).
+    """
+
+    size = height // 5
+    gap = size // 2
+    left = (width - 2 * size - gap) // 2
+    top = (height - 2 * size - gap) // 2
+    positions = {
+        1: (left, top),
+        2: (left + size + gap, top),
+        3: (left + size + gap, top + size + gap),
+        4: (left, top + size + gap)
+    }
+    return size, positions
+
+
+def make_frame(width, height, tags):
+    """
+    Draws the tags in the palm layout onto a white frame.
+    """
+
+    frame = np.full((height, width, 3), 255, dtype=np.uint8)
+    aruco_dict = cv2.aruco.getPredefinedDictionary(config.MY_ARUCO_DICT)
+    size, positions = layout(width, height)
+
+    for _id in tags:
+        x, y = positions[_id]
+        marker = cv2.aruco.generateImageMarker(aruco_dict, _id, size)
+        frame[y:y + size, x:x + size] = marker[:, :, np.newaxis]
+    return frame
+
+
+def measure(func, setup=None, repeat=REPEAT, number=1):
+    """
+    Returns the median time of one call of func in seconds.
+    setup runs before every measurement and is not timed.
+    """
+
+    func()
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times)
+
+
+def detect(cam, frame):
+    """
+    Runs the detection once and checks that the synthetic tags were found.
+    """
+
+    corners, ids = cam.detect(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    if ids is None:
+        raise RuntimeError("No tags found in the synthetic frame")
+    return corners, ids
+
+
+def prime(cam):
+    """
+    Detects the frame of the synthetic capture once, so the identical next frame reuses the detection.
+    """
+
+    cam.gate.clear()
+    cam.process_frame()
+    cam.process_frame()
+    if not cam.gate.reused:
+        raise RuntimeError("The static-scene gate did not reuse the synthetic frame")
+    cam.gate.clear()
+    cam.process_frame()
+
+
+def run(repeat=REPEAT, selection=None):
+    """
+    Runs the benchmarks (optionally only those containing selection).
+    Returns {name: seconds}.
+    """
+
+    results = {}
+
+    def bench(name, func, setup=None, number=1):
+        if selection is None or selection in name:
+            results[name] = measure(func, setup, repeat, number)
+
+    for resolution, (width, height) in RESOLUTIONS.items():
+        cam = vision.Camera()
+        te = palm.TagEvaluater()
+        snapshot_frame = make_frame(width, height, CASES["all"])
+        te.make_snapshot(*detect(cam, snapshot_frame), cam)
+        if not te.calibrated:
+            raise RuntimeError("Calibration on the synthetic frame failed")
+
+        for case, tags in CASES.items():
+            frame = make_frame(width, height, tags)
+            cam.cam = SyntheticCapture(frame)
+            corners, ids = detect(cam, frame)
+            prefix = f"{resolution}/{case}"
+
+            bench(f"process_frame/{prefix}", cam.process_frame, setup=cam.gate.clear)
+            if case == "all": # only complete detections are stored for reuse
+                bench(f"process_frame_reused/{prefix}", cam.process_frame, setup=lambda: prime(cam))
+            bench(f"update/{prefix}", lambda: te.update(*te.complete(corners, ids)), number=10)
+            bench(f"shoelace_formula/{prefix}", te._shoelace_formula, number=100)
+            bench(f"show_feed/{prefix}", lambda: cam.draw_feed(corners, ids, frame))
+
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Prints the results next to the baseline.
+    Returns the names of the benchmarks that regressed.
+    """
+
+    regressed = []
+    for name, seconds in results.items():
+        line = f"    - {name:<40} {seconds * 1e6:10.1f} µs"
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            line += f"  ({ratio:5.2f}x baseline)"
+            if ratio > 1 + threshold:
+                regressed.append(name)
+                line += " ❌"
+        print(line)
+    return regressed
+
+
+def main():
+    """
+    Runs the benchmarks and compares them with the baseline.
+    """
+
+    parser = argparse.ArgumentParser(description="Benchmarks of the vision and evaluation hot paths")
+    parser.add_argument("--update", action="store_true", help="store the results as new baseline")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--filter", default=None, help="only run benchmarks containing this text")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.filter)
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    print("⏱️ Benchmarks:")
+    regressed = compare(results, baseline, args.threshold)
+
+    if not baseline:
+        print("ℹ️ No baseline yet, the results are stored as the baseline of this machine")
+    if args.update or not baseline:
+        baseline.update(results)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=4)
+        print(f"💾 Baseline stored in {BASELINE_FILE}")
+    elif regressed:
+        print(f"❌ {len(regressed)} benchmarks slower than {args.threshold:.0%} over baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
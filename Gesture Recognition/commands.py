@@ -0,0 +1,334 @@
+"""
+Date: 17.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Cuts the radio traffic of the command path
+    - Forwards a command only if it differs from the last one sent
+    - Changes within one radio tick are merged, only the newest one is sent
+    - Repeats the last command as keepalive before the firmware setpoint timeout
+    - Counts sent, suppressed, merged and keepalive commands
+    - Optional DirectCommander: hover setpoints straight from the command loop,
+      without the setpoint thread of the MotionCommander (config.CONTROL_BACKEND)
+    - CommandQueue: command channel with priority levels, where land and stop
+      preempt all queued motion commands (requested from any thread)
+"""
+
+import heapq
+import itertools
+import threading
+
+import config
+import control
+
+
+STOP = ("stop", ())
+LAND = ("land", ())
+PRIORITY_LAND = 0 # lower is more urgent
+PRIORITY_STOP = 1
+PRIORITY_MOTION = 2
+
+
+class CommandFilter:
+    """
+    Stand-in for the MotionCommander between the DroneController and the radio.
+    Unknown attributes are forwarded to the MotionCommander.
+    """
+
+    def __init__(self, mc, keepalive=config.COMMAND_KEEPALIVE, tick=config.COMMAND_TICK, clock=control.CLOCK):
+        self._mc = mc
+        self.keepalive = keepalive
+        self.tick = tick
+        self.clock = clock
+        self.last = None
+        self.last_sent = -float("inf")
+        self.pending = None
+        self.closed = False
+        self.counts = {"sent": 0, "suppressed": 0, "merged": 0, "keepalive": 0}
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="command filter", daemon=True)
+        self.thread.start()
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Forwards a linear motion if it changed.
+        """
+
+        self._submit(("start_linear_motion", (velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw)))
+
+    def stop(self):
+        """
+        Forwards a stop if the drone is not stopped already.
+        """
+
+        self._submit(STOP)
+
+    def _submit(self, command):
+        with self.condition:
+            if self.pending is not None:
+                self.counts["merged"] += 1 # replaced before it was sent
+                self.pending = None
+
+            if command == self.last:
+                self.counts["suppressed"] += 1
+            elif self.clock.now() - self.last_sent < self.tick:
+                self.pending = command # sent by the thread at the end of the tick
+            else:
+                self._send(command)
+                self.counts["sent"] += 1
+            self.condition.notify() # the thread plans the next merge or keepalive
+
+    def _send(self, command):
+        name, args = command
+        if name == "stop":
+            self._mc.stop()
+        else:
+            *velocities, rate_yaw = args
+            self._mc.start_linear_motion(*velocities, rate_yaw=rate_yaw)
+        self.last = command
+        self.last_sent = self.clock.now()
+
+    def _run(self):
+        with self.condition:
+            while not self.closed:
+                now = self.clock.now()
+                if self.pending is not None and now - self.last_sent >= self.tick:
+                    self._send(self.pending)
+                    self.pending = None
+                    self.counts["sent"] += 1
+                elif self.last is not None and now - self.last_sent >= self.keepalive:
+                    self._send(self.last)
+                    self.counts["keepalive"] += 1
+
+                deadline = self.last_sent + (self.tick if self.pending is not None else self.keepalive)
+                self.condition.wait(max(0.0, deadline - self.clock.now()) if self.last is not None else None)
+
+    def land(self, *args, **kwargs):
+        """
+        Stops the keepalive and lands (a keepalive must not interrupt the descent).
+        """
+
+        self._halt()
+        self._mc.land(*args, **kwargs)
+
+    def _halt(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def close(self):
+        """
+        Stops the keepalive (before the MotionCommander lands) and prints the counters.
+        """
+
+        self._halt()
+        print(
+            f"📡 Commands: {self.counts['sent']} sent, {self.counts['suppressed']} suppressed, "
+            f"{self.counts['merged']} merged, {self.counts['keepalive']} keepalives")
+
+    def __getattr__(self, name):
+        return getattr(self._mc, name)
+
+
+class DirectCommander:
+    """
+    Replacement for the MotionCommander without its setpoint thread.
+    Every command is sent as hover setpoint right away from the calling thread (the command loop).
+    Take off and landing behave like the MotionCommander (estimator reset, ramp to default_height).
+    Without the setpoint thread something has to send at least every 0.5 s:
+    the command loop or the keepalive of a CommandFilter.
+    """
+
+    def __init__(self, crazyflie, default_height=config.DEFAULT_HEIGHT, clock=control.CLOCK):
+        self._cf = getattr(crazyflie, "cf", crazyflie) # Crazyflie or SyncCrazyflie
+        self.default_height = default_height
+        self.clock = clock
+        self.height = 0.0
+        self.velocity = (0.0, 0.0, 0.0, 0.0)
+        self.velocity_time = None
+        self.flying = False
+        self.lock = threading.Lock() # the command loop and the keepalive both send
+
+    def __enter__(self):
+        self.take_off()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.land()
+
+    def take_off(self, height=None, velocity=config.TAKEOFF_VELOCITY):
+        """
+        Resets the position estimator and climbs to the height (default_height if None).
+        """
+
+        if self.flying:
+            raise Exception("Already flying")
+
+        self.flying = True
+        self._cf.param.set_value("kalman.resetEstimation", "1")
+        self.clock.sleep(0.1)
+        self._cf.param.set_value("kalman.resetEstimation", "0")
+        self.clock.sleep(2)
+
+        self._ramp(self.default_height if height is None else height, velocity)
+
+    def land(self, velocity=config.TAKEOFF_VELOCITY):
+        """
+        Descends to the ground and turns off the motors.
+        """
+
+        if not self.flying:
+            return
+
+        self._ramp(0.0, velocity)
+        self._cf.commander.send_stop_setpoint()
+        self._cf.commander.send_notify_setpoint_stop()
+        self.flying = False
+
+    def _ramp(self, target, velocity):
+        with self.lock:
+            self._update_height()
+            self.velocity = (0.0, 0.0, 0.0, 0.0)
+            start = self.height
+
+        steps = max(1, round(abs(target - start) / velocity / config.SETPOINT_PERIOD))
+        for step in range(1, steps + 1):
+            with self.lock:
+                self.height = start + (target - start) * step / steps
+                self.velocity_time = self.clock.now()
+                self._cf.commander.send_hover_setpoint(0.0, 0.0, 0.0, self.height)
+            self.clock.sleep(config.SETPOINT_PERIOD)
+
+    def _update_height(self):
+        now = self.clock.now()
+        if self.velocity_time is not None:
+            self.height = max(0.0, self.height + self.velocity[2] * (now - self.velocity_time))
+        self.velocity_time = now
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Sends the velocities; the vertical velocity moves the height setpoint over time.
+        """
+
+        with self.lock:
+            self._update_height()
+            self.velocity = (velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw)
+            self._cf.commander.send_hover_setpoint(velocity_x_m, velocity_y_m, rate_yaw, self.height)
+
+    def stop(self):
+        """
+        Hovers at the current height.
+        """
+
+        self.start_linear_motion(0.0, 0.0, 0.0)
+
+
+class CommandQueue:
+    """
+    Stand-in for the MotionCommander: command channel with priority levels and its own sender thread.
+    Queued motion commands are replaced by newer ones; stop and land remove all queued commands
+    of lower priority and are sent next. After land() every further command is ignored.
+    Unknown attributes are forwarded to the MotionCommander.
+    """
+
+    def __init__(self, mc, clock=control.CLOCK):
+        self._mc = mc
+        self.clock = clock
+        self.queue = [] # heap of (priority, sequence, command)
+        self.sequence = itertools.count()
+        self.landing = False
+        self.closed = False
+        self.land_requested = None # time of the land request
+        self.counts = {"sent": 0, "replaced": 0, "preempted": 0, "ignored": 0, "failed": 0}
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="command queue", daemon=True)
+        self.thread.start()
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Queues a linear motion (replaces a motion that was not sent yet).
+        """
+
+        self._put(PRIORITY_MOTION, ("start_linear_motion", (velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw)))
+
+    def stop(self):
+        """
+        Queues a stop before all queued motion commands.
+        """
+
+        self._put(PRIORITY_STOP, STOP)
+
+    def land(self):
+        """
+        Lands as soon as the current command is sent; everything queued is dropped.
+        Can be called from any thread. Lands on the calling thread if the sender thread is gone.
+        """
+
+        if not self.thread.is_alive() and not self.closed:
+            print("❌ Command queue: sender thread gone, landing directly")
+            self.landing = True
+            self._mc.land()
+            return
+        self._put(PRIORITY_LAND, LAND)
+
+    def _put(self, priority, command):
+        with self.condition:
+            if self.landing or self.closed:
+                self.counts["ignored"] += 1
+                return
+
+            kept = [item for item in self.queue if item[0] < priority]
+            dropped = len(self.queue) - len(kept)
+            if priority == PRIORITY_MOTION:
+                self.counts["replaced"] += dropped
+            else:
+                self.counts["preempted"] += dropped
+            if dropped:
+                self.queue = kept
+                heapq.heapify(self.queue)
+
+            if command == LAND:
+                self.landing = True
+                self.land_requested = self.clock.now()
+            heapq.heappush(self.queue, (priority, next(self.sequence), command))
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                _, _, command = heapq.heappop(self.queue)
+
+            name, args = command
+            try:
+                if name == "start_linear_motion":
+                    *velocities, rate_yaw = args
+                    self._mc.start_linear_motion(*velocities, rate_yaw=rate_yaw)
+                else:
+                    getattr(self._mc, name)() # stop or land (blocks until landed)
+            except Exception as e: # a failed command must not take the landing down with the thread
+                self.counts["failed"] += 1
+                print(f"❌ Command queue: {name} failed ({e})")
+                continue
+            self.counts["sent"] += 1
+
+    def close(self):
+        """
+        Sends what is still queued (a requested landing included) and prints the counters.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+        print(
+            f"🚦 Command queue: {self.counts['sent']} sent, {self.counts['replaced']} replaced, "
+            f"{self.counts['preempted']} preempted, {self.counts['ignored']} ignored, {self.counts['failed']} failed")
+
+    def __getattr__(self, name):
+        return getattr(self._mc, name)
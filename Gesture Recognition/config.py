@@ -4,12 +4,10 @@ Date: 14.10.2025
 Author: Nelio Gautschi
 
 Purpose:
-    - Stores project-wide classes, constants and functions
+    - Stores project-wide constants
+    - The classes and functions that use them are in control.py and vision.py
 """
 
-import time
-import sys
-
 import cv2
 
 
@@ -27,219 +25,88 @@ VT = 0.5 # tilt (forward/backward) velocity
 VA = 0.2 # altitude (up/down) velocity
 VY = 30 # yaw (right/left) velocity
 
+PROCESS_SPLIT = False # capture and detection in a separate process (see vision_process.py)
+PIPELINE_WORKERS = 0 # detection threads of the pipelined camera, 0 to disable (see pipelined.py)
+PIPELINE_MAX_DEPTH = 4 # max. number of frames in the pipeline (each one adds latency)
+PIPELINE_WINDOW = 60 # frames per throughput/latency measurement
+
+STREAM_THREADED = [] # stream stages on their own thread, e.g. ["source", "detect"]
+STREAM_QUEUE_SIZE = 2 # max. number of frames waiting in front of a threaded stage
+STREAM_DISPLAY = True # show the camera feed
+STREAM_REPORT = True # print the stage timings when the stream ends
+
+RUNTIME = "stream" # "stream" (stream.py) or "asyncio" (runtime.py)
+COMMAND_PERIOD = 0.1 # seconds between two commands of the asyncio runtime
+COMMAND_QUEUE = True # priority command channel, land and stop preempt queued motion (see commands.py)
+SAFETY_LATENCY = 0.02 # max. seconds from a land request to the radio (checked by simulator.py)
+COMMAND_FILTER = True # only send changed commands (see commands.py)
+COMMAND_KEEPALIVE = 0.25 # seconds after which an unchanged command is repeated (firmware timeout is 0.5 s)
+COMMAND_TICK = 0.01 # seconds in which consecutive changes are merged into one command
+CONTROL_BACKEND = "motion_commander" # "motion_commander" (cflib) or "direct" (commands.DirectCommander)
+COMMAND_PACE = 0.1 # seconds the loop waits after a command to the MotionCommander (the "direct" backend does not wait)
+SETPOINT_PERIOD = 0.02 # seconds between two setpoints of the direct take off and landing
+TAKEOFF_VELOCITY = 0.2 # vertical velocity of the direct take off and landing in m/s
+LIVE_TAG = 0 # tag that keeps live control without the hand tags (see POC aruco_scan_multiple.py)
+MODE_TIMEOUT = 1.5 # seconds without live tags before the autonomous behaviour takes over
+AUTONOMOUS = "hover" # autonomous behaviour: "hover", "return" (retraces the flown commands) or "mission" (mission.ROUTE)
+MISSION_VELOCITY = 0.2 # max. velocity of the compiled mission trajectories in m/s (see mission.py)
+MISSION_RATE = 72 # max. yaw rate of the compiled mission trajectories in degrees/s
+MISSION_TRAJECTORY_ID = 1 # id under which the mission trajectory is defined on the Crazyflie
+INPUT_KEYBOARD = False # keyboard override of the gesture control (see arbiter.py, needs pynput)
+INPUT_SOURCES = { # priority (the highest active source is flown) and seconds until an intent expires (None: until released)
+    "keyboard": (2, None),
+    "gesture": (1, 0.5),
+    "mission": (0, 0.5)
+}
+BATTERY_SUPERVISOR = True # scales the velocities and lands on low battery (see battery.py)
+BATTERY_SLOW = 30 # battery level in % below which the velocities are scaled down
+BATTERY_LAND = 10 # battery level in % at which the drone lands (POC test_battery.py used 5)
+BATTERY_MIN_SCALE = 0.4 # velocity factor just above BATTERY_LAND
+BATTERY_SMOOTHING = 0.02 # weight of a new sample in the smoothed battery level (it sags under load)
+BATTERY_SCALE_STEP = 0.05 # velocity factor changes in steps, so the CommandFilter can still drop repeated commands
+WATCHDOG_PERIOD = 0.05 # seconds between two safety checks of the asyncio runtime
+TELEMETRY_PERIOD = 10 # logging period in milliseconds (10 is the fastest the firmware supports)
+TELEMETRY_VARIABLES = [("range.zrange", "uint16_t"), ("pm.batteryLevel", "uint8_t")]
+TELEMETRY_DIR = None # folder for telemetry recordings, None to only keep the latest values
+
+RECORD_DIR = None # empty or new folder for a flight recording (see recorder.py), None to disable
+RECORD_FRAMES = "jpeg" # "jpeg", "raw" or None (no frames)
+RECORD_QUEUE_SIZE = 256 # max. number of records waiting for the writer
+RECORD_QUEUE_BYTES = 128 * 1024 * 1024 # max. bytes of the frames waiting for the writer
+RECORD_CLOSE_TIMEOUT = 5.0 # max. seconds the recorder waits for its writer after the flight
+RECORD_CHUNK_SIZE = 64 * 1024 * 1024 # bytes per chunk file
+
+TRACE_FILE = None # Chrome trace JSON written at the end of a session (see tracing.py), None to disable
+TRACE_BUFFER_SIZE = 200000 # max. number of events kept per thread (the oldest are dropped)
+
+EVALUATER = "ratio" # "ratio" (area/distance comparison) or "pnp" (pose estimation)
+CALIBRATION_DISTANCE = 0.2 # hand to camera distance during calibration in meters
+PNP_METHOD = "iterative" # "iterative" (warm-started) or "ippe"
+PNP_T_DZ = 0.1 # tilt deadzone in radians
+PNP_T_MAX = 0.5 # tilt in radians for full velocity
+PNP_Y_DZ = 0.1 # yaw deadzone in radians
+PNP_Y_MAX = 0.5 # yaw in radians for full velocity
+PNP_A_DZ = 0.02 # altitude deadzone in meters
+PNP_A_MAX = 0.1 # altitude offset in meters for full velocity
+
+GATE_SCALE = 0.25 # downsampling factor of the static-scene gate
+GATE_THRESHOLD = 2.0 # mean grey value difference that counts as a change
+GATE_MAX_AGE = 5 # max. number of frames a detection result can be reused
+GATE_MARGIN = 20 # pixels added around the tag region
+
+TARGET_PERIOD = 0.033 # processing time budget per frame in seconds
+HEADROOM = 0.5 # share of the budget below which the governor raises the quality again
+MIN_TAG_SIZE = 30 # min. tag side length in pixels at processing resolution
+GOVERNOR_COOLDOWN = 15 # frames between two governor changes
+GOVERNOR_LEVELS = [ # (processing scale, adaptiveThreshWinSizeMax)
+    (1.0, 23),
+    (1.0, 13),
+    (0.75, 13),
+    (0.5, 3)
+]
+
 my_exceptions = {
     f"No driver found or malformed URI: {MY_URI}": "❌ Crazyradio not plugged in.",
     "Could not load link driver: Cannot find a Crazyradio Dongle": "❌ Crazyradio not plugged in.",
     "Too many packets lost": "❌ Crazyflie not turned on."
 }
-
-
-class DroneController:
-    """
-    Drone controller class.
-    Stores a value on if the drone should be flying.
-    Sends movement instructions.
-    """
-    def __init__(self):
-        self.flying = True
-        self.mc = None
-
-    def land(self):
-        """
-        Landing function; lands the drone safely if hand has gone undetecked for too long
-        """
-
-        self.mc.stop()
-
-    def send_instructions(self, velocities):
-        """
-        Starts a linear motion with the velocities:
-            - v_til is for back/forth
-            - v_yaw is for left/right
-            - v_alt is for up/down
-        """
-
-        v_til, v_alt, v_yaw = velocities
-        self.mc.start_linear_motion(v_til, 0, v_alt, rate_yaw=v_yaw)
-
-        time.sleep(0.1)
-
-    def determine_state(self, mc, velocities):
-        """
-        Calls functions based on whether the drone should stay in air.
-        """
-
-        self.mc = mc
-        if self.flying is False:
-            self.land()
-        else:
-            self.send_instructions(velocities)
-
-
-class Camera:
-    """
-    Handles the camera and the aruco detection.
-    """
-
-    def __init__(self):
-        self.cam = None
-        self.aruco_dict = cv2.aruco.getPredefinedDictionary(MY_ARUCO_DICT)
-        self.parameters = cv2.aruco.DetectorParameters()
-        self.reference = []
-
-    def open_cam(self, index=0): # 0 for built-in camera
-        """
-        Opens the camera safely
-        """
-
-        self.cam = cv2.VideoCapture(index)
-        if not self.cam.isOpened():
-            raise IOError("Cannot open camera")
-
-    def close_cam(self):
-        """
-        Closes the camera and destroys GUI.
-        """
-
-        self.cam.release()
-        cv2.destroyAllWindows()
-        cv2.waitKey(1)
-
-    def process_frame(self):
-        """
-        Reads camera feed (ends script if feed is unsubscriptable).
-        Creates detector instance.
-        Converts feed to grayscale for better detection results.
-        Returns important data.
-        """
-
-        success, frame = self.cam.read()
-        if not success:
-            print("Cannot receive frame (stream end?). Exiting ...")
-            sys.exit()
-
-        detector = cv2.aruco.ArucoDetector(self.aruco_dict, self.parameters)
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        corners, ids, _ = detector.detectMarkers(gray_frame)
-
-        return frame, corners, ids
-
-    def show_feed(self, corners, ids, feed_frame):
-        """
-        Draws the reference marker onto camera feed.
-        Draws detected corners of aruco tags onto feed.
-        Displays feed.
-        """
-
-        if self.reference:
-            tl = self.reference[0]
-            br = self.reference[1]
-            cv2.rectangle(feed_frame, tl, br, (0, 0, 255), 2)
-
-        if ids is not None and len(ids) != 0:
-            for i, _ in enumerate(ids.flatten()):
-                for corner in corners[i][0]:
-                    x, y = corner
-                    feed_frame = cv2.circle(
-                        feed_frame.copy(),
-                        (int(x), int(y)),
-                        radius=5,
-                        color=(0, 0, 255),
-                        thickness=-1)
-
-        cv2.imshow("Camera Feed", cv2.flip(feed_frame, 1))
-
-
-class Timer:
-    """
-    Imitates timer functionality.
-    """
-
-    def __init__(self, timeout=5):
-        self.start_time = time.perf_counter()
-        self.t = timeout
-
-    def reset(self):
-        """
-        Starts and resets a timer.
-        """
-
-        self.start_time = time.perf_counter()
-
-    def safety_check(self, controller, cam):
-        """
-        Compares the difference of the current time and when the timer started.
-        Initiates the landing process of the drone if timeout was reached.
-        """
-
-        if time.perf_counter() - self.start_time >= self.t:
-            controller.flying = False
-            cam.close_cam()
-
-
-def calibrate(te, cam):
-    """
-    Runs calibration process of the hand.
-    Calls draw_text() function from custom config module.
-    Displays the animation and text on feed.
-    """
-
-    setpoint = 5
-    cam.open_cam()
-    mode = None
-
-    while True:
-        frame, corners, ids = cam.process_frame()
-        mode = [3, 4]
-
-        if cv2.waitKey(1) == ord("q"):
-            sys.exit()
-
-        if not te.calibrated:
-            now = time.perf_counter()
-            if cv2.waitKey(1) == ord("s"):
-                setpoint = now
-
-            if now - setpoint < 4:
-                if now - setpoint < 3:
-                    te.make_snapshot(corners, ids, cam)
-                    mode = [1]
-                else:
-                    mode = [2]
-        else:
-            mode = [5]
-
-        if mode == [5]:
-            cam.close_cam()
-            break
-
-        cam.show_feed(corners, ids, draw_text(frame, mode))
-
-
-def draw_text(frame, mode):
-    """
-    Draws text and animations based on current state of the calibration process.
-    """
-
-    flipped_frame = cv2.flip(frame, 1)
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    blue = (200, 0, 0)
-
-    lines = [
-        (f"Calibrating{'.' * ((int(time.time() / 0.75) % 3) + 1)}", (0, 255, 0), 2),
-        ("Failed. Try again.", (0, 0, 255), 2),
-        ("Position your hand 20cm away from the camera in the middle of the screen.", blue, 2),
-        ("Press 's' when you see red dots on all tag corners.", blue, 1)
-    ]
-
-    y_offset = 10
-
-    for _, i in enumerate(mode):
-        text, color, thickness = lines[i-1]
-        text_size = cv2.getTextSize(text, font, 1.0, thickness)[0]
-        x = (flipped_frame.shape[1] - text_size[0]) // 2
-        y = y_offset + text_size[1]
-        cv2.putText(flipped_frame, text, (x, y), font, 1.0, color, thickness)
-        y_offset = y + 10
-
-    return cv2.flip(flipped_frame, 1)
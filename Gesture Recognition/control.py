@@ -0,0 +1,152 @@
+"""
+Date: 25.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Clock of the timer, the calibration, the animations and the command pacing
+    - DroneController that turns the evaluated velocities into commands and lands the drone
+    - Safety timer that lands the drone once the hand has gone undetected for too long
+"""
+
+import time
+
+import config
+
+
+class Clock:
+    """
+    Source of time for the timer, the calibration, the animations and the command pacing.
+    Replaced by replay.ReplayClock to run a recorded flight faster than real time.
+    """
+
+    def now(self):
+        """
+        Returns the monotonic time in seconds.
+        """
+
+        return time.perf_counter()
+
+    def wall(self):
+        """
+        Returns the wall clock time in seconds (used for animations).
+        """
+
+        return time.time()
+
+    def sleep(self, seconds):
+        """
+        Waits for the given number of seconds.
+        """
+
+        time.sleep(seconds)
+
+
+CLOCK = Clock()
+
+
+class DroneController:
+    """
+    Drone controller class.
+    Stores a value on if the drone should be flying.
+    Sends movement instructions.
+    """
+    def __init__(self, clock=CLOCK):
+        self.flying = True
+        self.mc = None
+        self.queue = None # commands.CommandQueue in front of the radio, if used
+        self.clock = clock
+        # the CommandFilter keepalive of the direct backend covers the firmware timeout, no need to pace the loop
+        self.pace = 0.0 if config.CONTROL_BACKEND == "direct" else config.COMMAND_PACE
+
+    def land(self):
+        """
+        Landing function; lands the drone safely if hand has gone undetecked for too long
+        """
+
+        self.mc.stop()
+        if self.queue is not None:
+            self.mc.land() # reaches the queue through all stand-ins, so the recorder sees it too
+
+    def request_land(self):
+        """
+        Ends the flight from any thread (safety timeout, operator, battery).
+        With a command queue the landing preempts all queued commands right away,
+        otherwise it starts when the loop reaches determine_state().
+        """
+
+        self.flying = False
+        if self.queue is not None:
+            (self.queue if self.mc is None else self.mc).land()
+
+    def send_instructions(self, velocities):
+        """
+        Starts a linear motion with the velocities:
+            - v_til is for back/forth
+            - v_yaw is for left/right
+            - v_alt is for up/down
+        Waits self.pace afterwards, but not with a command queue:
+        the loop has to reach the safety check and the quit key right away.
+        """
+
+        self.move(velocities)
+
+        if self.pace and self.queue is None:
+            self.clock.sleep(self.pace)
+
+    def move(self, velocities):
+        """
+        Hands the velocities to the MotionCommander without waiting.
+        """
+
+        v_til, v_alt, v_yaw = velocities
+        self.mc.start_linear_motion(v_til, 0, v_alt, rate_yaw=v_yaw)
+
+    def determine_state(self, mc, velocities):
+        """
+        Calls functions based on whether the drone should stay in air.
+        """
+
+        self.mc = mc
+        if self.flying is False:
+            self.land()
+        else:
+            self.send_instructions(velocities)
+
+
+class Timer:
+    """
+    Imitates timer functionality.
+    """
+
+    def __init__(self, timeout=5, clock=CLOCK):
+        self.clock = clock
+        self.start_time = clock.now()
+        self.t = timeout
+
+    def reset(self, now=None):
+        """
+        Starts and resets a timer.
+        The time can be given (e.g. the capture time of a frame) to make the timer reproducible.
+        """
+
+        self.start_time = self.clock.now() if now is None else now
+
+    def safety_check(self, controller, cam, now=None):
+        """
+        Compares the difference of the current time and when the timer started.
+        Initiates the landing process of the drone if timeout was reached.
+        """
+
+        if self.expired(now):
+            controller.request_land()
+            cam.close_cam()
+
+    def expired(self, now=None):
+        """
+        Returns True if the timeout was reached since the last reset.
+        """
+
+        if now is None:
+            now = self.clock.now()
+        return now - self.start_time >= self.t
@@ -16,10 +16,6 @@ import sys
 import time
 from threading import Event
 
-import cflib.crtp
-from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
-from cflib.crazyflie import Crazyflie
-
 import config
 
 
@@ -34,6 +30,8 @@ def get_uri():
     Prints the URIs that can be used to connect.
     """
 
+    import cflib.crtp # loaded on demand, the radio stack is slow to import
+
     print("🔍 Scanning interfaces for Crazyflies...")
     available = cflib.crtp.scan_interfaces()
 
@@ -50,6 +48,9 @@ def detect_deck():
     Checks if the Flowdeck V2 is attached to the Crazyflie.
     """
 
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+
     print("🔍 Scanning interfaces for Decks...")
 
     try:
@@ -102,6 +103,8 @@ def main(*mode):
     Runs the selected mode with optional arguments.
     """
 
+    import cflib.crtp
+
     cflib.crtp.init_drivers()
 
     func = MODES[mode[0]]
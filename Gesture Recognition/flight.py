@@ -0,0 +1,117 @@
+"""
+Date: 24.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Flight of palm.py and whole_hand.py, which only differ in their TagEvaluater
+    - Calibrates, connects to the crazyflie and chains the MotionCommander stand-ins:
+      backend -> CommandFilter -> CommandQueue -> BatterySupervisor -> InputArbiter -> recorder tap
+    - Runs the gesture loop (stream.py or runtime.py) and shuts the chain down in reverse order
+"""
+
+import time
+
+import arbiter
+import battery
+import commands
+import config
+import control
+import debug
+import pipelined
+import pose
+import recorder
+import startup
+import stream
+import tracing
+import vision
+import vision_process
+
+
+def main(evaluater):
+    """
+    Initiates all the classes for the evaluater class (pose estimation if config.EVALUATER is "pnp").
+    Catches errors.
+    Connects to crazyflie with the MotionCommander
+    The radio stack is loaded in the background during the calibration.
+    """
+
+    if config.TRACE_FILE:
+        tracing.start()
+    radio = startup.RadioLoader(["runtime"] if config.RUNTIME == "asyncio" else None)
+
+    if config.PROCESS_SPLIT:
+        cam = vision_process.RemoteCamera()
+    elif config.PIPELINE_WORKERS:
+        cam = pipelined.PipelinedCamera()
+    else:
+        cam = vision.Camera()
+    sw = control.Timer()
+    te = pose.PoseEvaluater() if config.EVALUATER == "pnp" else evaluater()
+    controller = control.DroneController()
+    flight_recorder = recorder.FlightRecorder(config.RECORD_DIR) if config.RECORD_DIR else None
+
+    vision.calibrate(te, cam, flight_recorder=flight_recorder)
+
+    radio.wait()
+    # already loaded by the RadioLoader
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+    from cflib.positioning.motion_commander import MotionCommander
+    import runtime
+    debug.main("deck")
+
+    try:
+        with SyncCrazyflie(config.MY_URI, cf=Crazyflie(rw_cache="cache")) as scf:
+            tracing.attach(scf.cf)
+            scf.cf.platform.send_arming_request(True)
+            time.sleep(1.0)
+            backend = commands.DirectCommander if config.CONTROL_BACKEND == "direct" else MotionCommander
+            with backend(scf, default_height=config.DEFAULT_HEIGHT) as mc:
+                command_filter = commands.CommandFilter(mc) if config.COMMAND_FILTER else None
+                if command_filter is not None:
+                    mc = command_filter
+                command_queue = commands.CommandQueue(mc) if config.COMMAND_QUEUE else None
+                if command_queue is not None:
+                    mc = command_queue
+                    controller.queue = command_queue
+                supervisor = battery.BatterySupervisor(mc, controller) if config.BATTERY_SUPERVISOR else None
+                if supervisor is not None:
+                    mc = supervisor
+                    supervisor.start(scf, flight_recorder)
+                input_arbiter = arbiter.InputArbiter(mc) if config.INPUT_KEYBOARD else None
+                keyboard = None
+                if input_arbiter is not None:
+                    mc = input_arbiter
+                    keyboard = arbiter.KeyboardSource(input_arbiter, on_quit=controller.request_land)
+                    keyboard.start()
+                if flight_recorder is not None:
+                    mc = flight_recorder.tap(mc)
+                cam.open_cam()
+                try:
+                    if config.RUNTIME == "asyncio":
+                        telemetry_recorder = supervisor.telemetry if supervisor is not None else None
+                        runtime.GestureRuntime(cam, te, controller, sw, mc, scf, flight_recorder, telemetry_recorder).run()
+                    else:
+                        stream.gesture_stream(cam, te, controller, sw, mc, flight_recorder).run()
+                finally:
+                    if keyboard is not None:
+                        keyboard.stop()
+                    if input_arbiter is not None:
+                        input_arbiter.close() # no overrides during the landing
+                    if supervisor is not None:
+                        supervisor.stop()
+                    if command_queue is not None:
+                        command_queue.close() # waits for a requested landing
+                    if command_filter is not None:
+                        command_filter.close() # no keepalives during the landing
+
+    except Exception as e:
+        debug.handle_error(e)
+
+    finally:
+        if flight_recorder is not None:
+            flight_recorder.close()
+        if config.TRACE_FILE:
+            tracing.write(config.TRACE_FILE)
+
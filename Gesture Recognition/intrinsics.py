@@ -0,0 +1,212 @@
+"""
+Date: 21.10.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Calibrates the camera intrinsics with a ChArUco board
+    - Stores the camera matrix per camera index and resolution
+    - Corrects the lens distortion of detected tag corners with a precomputed lookup table
+
+If executed directly, it will:
+    - Open the camera given as first argument (default 0)
+    - Press 'c' to capture a view of the board, 'q' to calibrate and save
+"""
+
+import sys
+import json
+import os
+
+import cv2
+import numpy as np
+
+
+INTRINSICS_FILE = "intrinsics.json"
+CHARUCO_DICT = cv2.aruco.DICT_5X5_100 # different dictionary than the hand tags
+CHARUCO_SIZE = (5, 7) # squares in x and y
+CHARUCO_SQUARE = 0.04 # square side length in meters
+CHARUCO_MARKER = 0.03 # marker side length in meters
+MIN_VIEWS = 10
+MIN_CORNERS = 6
+
+
+def make_board():
+    """
+    Creates the ChArUco board used for the calibration.
+    """
+
+    dictionary = cv2.aruco.getPredefinedDictionary(CHARUCO_DICT)
+    board = cv2.aruco.CharucoBoard(
+        CHARUCO_SIZE,
+        CHARUCO_SQUARE,
+        CHARUCO_MARKER,
+        dictionary)
+    return board
+
+
+def get_key(index, width, height):
+    """
+    Returns the key under which the intrinsics of a camera are stored.
+    """
+
+    return f"cam{index}_{width}x{height}"
+
+
+def load_intrinsics(index, width, height):
+    """
+    Loads the camera matrix and distortion coefficients.
+    Returns None if the camera was never calibrated at this resolution.
+    """
+
+    if not os.path.exists(INTRINSICS_FILE):
+        return None
+
+    with open(INTRINSICS_FILE, "r", encoding="utf-8") as file:
+        stored = json.load(file)
+
+    entry = stored.get(get_key(index, width, height))
+    if entry is None:
+        return None
+
+    camera_matrix = np.array(entry["camera_matrix"], dtype=np.float64)
+    dist_coeffs = np.array(entry["dist_coeffs"], dtype=np.float64)
+    return camera_matrix, dist_coeffs
+
+
+def save_intrinsics(index, width, height, camera_matrix, dist_coeffs, error):
+    """
+    Saves the camera matrix and distortion coefficients next to the other cameras.
+    """
+
+    stored = {}
+    if os.path.exists(INTRINSICS_FILE):
+        with open(INTRINSICS_FILE, "r", encoding="utf-8") as file:
+            stored = json.load(file)
+
+    stored[get_key(index, width, height)] = {
+        "camera_matrix": camera_matrix.tolist(),
+        "dist_coeffs": dist_coeffs.ravel().tolist(),
+        "error": error
+    }
+
+    with open(INTRINSICS_FILE, "w", encoding="utf-8") as file:
+        json.dump(stored, file, indent=4)
+
+
+class Undistorter:
+    """
+    Corrects single points instead of whole frames.
+    The lookup table maps every raw pixel to its undistorted position and is built once.
+    """
+
+    def __init__(self, camera_matrix, dist_coeffs, width, height):
+        xs, ys = np.meshgrid(
+            np.arange(width, dtype=np.float32),
+            np.arange(height, dtype=np.float32))
+        grid = np.stack((xs.ravel(), ys.ravel()), axis=1).reshape(-1, 1, 2)
+        undistorted = cv2.undistortPoints(
+            grid, camera_matrix, dist_coeffs, P=camera_matrix).reshape(height, width, 2)
+
+        self.camera_matrix = camera_matrix
+        self.map_x = undistorted[:, :, 0]
+        self.map_y = undistorted[:, :, 1]
+        self.width = width
+        self.height = height
+
+    def correct(self, corners):
+        """
+        Looks up the undistorted position of all corners with bilinear interpolation.
+        Returns the corners in the same format as detectMarkers.
+        """
+
+        if not corners:
+            return corners
+
+        points = np.concatenate([corner.reshape(-1, 2) for corner in corners])
+        x = np.clip(points[:, 0], 0, self.width - 1.001)
+        y = np.clip(points[:, 1], 0, self.height - 1.001)
+        x0 = x.astype(np.int32)
+        y0 = y.astype(np.int32)
+        fx = x - x0
+        fy = y - y0
+
+        corrected = np.empty_like(points)
+        for i, table in enumerate((self.map_x, self.map_y)):
+            top = table[y0, x0] * (1 - fx) + table[y0, x0 + 1] * fx
+            bottom = table[y0 + 1, x0] * (1 - fx) + table[y0 + 1, x0 + 1] * fx
+            corrected[:, i] = top * (1 - fy) + bottom * fy
+
+        return tuple(corrected.reshape(-1, 1, 4, 2))
+
+
+def create_undistorter(index, width, height):
+    """
+    Builds the Undistorter for a camera if it was calibrated at this resolution.
+    """
+
+    intrinsics = load_intrinsics(index, width, height)
+    if intrinsics is None:
+        print(f"ℹ️ No intrinsics for {get_key(index, width, height)}, corners stay uncorrected.")
+        return None
+
+    camera_matrix, dist_coeffs = intrinsics
+    return Undistorter(camera_matrix, dist_coeffs, width, height)
+
+
+def calibrate_intrinsics(index=0):
+    """
+    Collects views of the ChArUco board.
+    Calculates and saves the intrinsics of the camera.
+    """
+
+    board = make_board()
+    detector = cv2.aruco.CharucoDetector(board)
+    cam = cv2.VideoCapture(index)
+    if not cam.isOpened():
+        raise IOError("Cannot open camera")
+
+    object_points = []
+    image_points = []
+    size = None
+
+    try:
+        while True:
+            success, frame = cam.read()
+            if not success:
+                print("Cannot receive frame (stream end?). Exiting ...")
+                sys.exit()
+
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            size = gray_frame.shape[::-1]
+            charuco_corners, charuco_ids, _, _ = detector.detectBoard(gray_frame)
+
+            if charuco_ids is not None:
+                cv2.aruco.drawDetectedCornersCharuco(frame, charuco_corners, charuco_ids)
+            text = f"Views: {len(object_points)}/{MIN_VIEWS}"
+            cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (200, 0, 0), 2)
+            cv2.imshow("Intrinsics Calibration", frame)
+
+            key = cv2.waitKey(1)
+            if key == ord("c") and charuco_ids is not None and len(charuco_ids) >= MIN_CORNERS:
+                obj, img = board.matchImagePoints(charuco_corners, charuco_ids)
+                object_points.append(obj)
+                image_points.append(img)
+            elif key == ord("q"):
+                break
+    finally:
+        cam.release()
+        cv2.destroyAllWindows()
+
+    if len(object_points) < MIN_VIEWS:
+        print(f"❌ Only {len(object_points)} views captured, at least {MIN_VIEWS} needed.")
+        return
+
+    error, camera_matrix, dist_coeffs, _, _ = cv2.calibrateCamera(
+        object_points, image_points, size, None, None)
+    width, height = size
+    save_intrinsics(index, width, height, camera_matrix, dist_coeffs, error)
+    print(f"✅ Saved intrinsics for {get_key(index, width, height)} (error {error:.3f} px)")
+
+
+if __name__ == "__main__":
+    calibrate_intrinsics(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
@@ -0,0 +1,269 @@
+"""
+Date: 19.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Compiles scripted flights (like the route of POC motion_commander.py) into a polynomial trajectory
+    - Every step becomes one 7th order piece that starts and ends at rest (zero velocity, acceleration and jerk)
+    - Uploads the trajectory once to the trajectory memory of the Crazyflie
+    - Flies it with the high-level commander: no setpoint stream, no host timing between the steps
+
+If executed directly, it will:
+    - Compile the POC route, fly it on the simulator (simulator.py) and compare the flown waypoints
+"""
+
+import sys
+import math
+import struct
+
+import numpy as np
+
+import config
+import control
+
+
+ROUTE = [ # route of POC motion_commander.py (take off and landing are added by fly())
+    ("hold", 2),
+    ("turn_left", 180),
+    ("forward", 1.5),
+    ("hold", 2),
+    ("turn_left", 180),
+    ("hold", 2),
+    ("forward", 1.5)
+]
+MOVES = { # body frame direction (forward, left, up) of the linear steps
+    "forward": (1, 0, 0),
+    "back": (-1, 0, 0),
+    "left": (0, 1, 0),
+    "right": (0, -1, 0),
+    "up": (0, 0, 1),
+    "down": (0, 0, -1)
+}
+TURNS = {"turn_left": 1, "turn_right": -1}
+PROFILE = np.array([0, 0, 0, 0, 35, -84, 70, -20], dtype=float) # rest to rest polynomial on [0, 1]
+PEAK = 35 / 16 # peak velocity of the profile relative to the mean velocity
+PIECE_SIZE = struct.calcsize("<33f") # bytes of one piece in the trajectory memory
+MIN_DURATION = 0.1 # seconds of the shortest piece
+TOLERANCE = 0.01 # allowed waypoint error of the verification in m (and rad)
+
+
+def travel_time(distance, velocity):
+    """
+    Returns the duration of a rest to rest piece that does not exceed the velocity.
+    """
+
+    return max(MIN_DURATION, PEAK * abs(distance) / velocity)
+
+
+def piece(start, end, duration):
+    """
+    Returns the piece (duration, coefficients) from pose start to pose end (x, y, z, yaw).
+    coefficients has one row of 8 polynomial coefficients per axis.
+    """
+
+    start = np.asarray(start, dtype=float)
+    delta = np.asarray(end, dtype=float) - start
+    scale = duration ** -np.arange(8, dtype=float)
+    coefficients = delta[:, np.newaxis] * PROFILE * scale
+    coefficients[:, 0] = start
+    return duration, coefficients
+
+
+def evaluate(pieces, t):
+    """
+    Returns the pose (x, y, z, yaw) of the trajectory t seconds after its start.
+    """
+
+    for duration, coefficients in pieces:
+        if t <= duration:
+            break
+        t -= duration
+    t = min(t, duration)
+    return coefficients @ (t ** np.arange(8, dtype=float))
+
+
+def velocity(pieces, t):
+    """
+    Returns the velocity (vx, vy, vz, yaw rate) of the trajectory t seconds after its start.
+    The velocity is zero after the end.
+    """
+
+    for duration, coefficients in pieces:
+        if t <= duration:
+            return coefficients[:, 1:] @ (np.arange(1, 8) * t ** np.arange(7, dtype=float))
+        t -= duration
+    return np.zeros(4)
+
+
+class Mission:
+    """
+    Scripted flight compiled into a trajectory that starts at the origin (0, 0, 0, yaw 0).
+    Flown relative to the position where it is started.
+    """
+
+    def __init__(self, steps, height=config.DEFAULT_HEIGHT, velocity=config.MISSION_VELOCITY, rate=config.MISSION_RATE):
+        self.steps = steps
+        self.height = height
+        self.velocity = velocity
+        self.rate = math.radians(rate)
+        self.pieces = []
+        self.waypoints = [(0.0, np.zeros(4))] # (seconds since start, pose at the end of a step)
+        self._compile()
+
+    def _compile(self):
+        pose = np.zeros(4)
+        for name, *args in self.steps:
+            end = pose.copy()
+            if name == "hold":
+                duration = args[0]
+            elif name in MOVES:
+                forward, left, up = MOVES[name]
+                distance = args[0]
+                yaw = pose[3]
+                end[0] += distance * (forward * math.cos(yaw) - left * math.sin(yaw))
+                end[1] += distance * (forward * math.sin(yaw) + left * math.cos(yaw))
+                end[2] += distance * up
+                duration = travel_time(distance, self.velocity)
+            elif name in TURNS:
+                end[3] += TURNS[name] * math.radians(args[0])
+                duration = travel_time(end[3] - pose[3], self.rate)
+            else:
+                raise ValueError(f"Unknown mission step {name}")
+
+            self.pieces.append(piece(pose, end, duration))
+            self.waypoints.append((self.duration, end))
+            pose = end
+
+    @property
+    def duration(self):
+        """
+        Returns the flight time of the trajectory in seconds.
+        """
+
+        return sum(duration for duration, _ in self.pieces)
+
+    def body_velocity(self, t):
+        """
+        Returns the velocity t seconds after the start in the frame of the drone:
+        (forward, left, up in m/s, yaw rate in degrees/s) like the arguments of start_linear_motion.
+        """
+
+        vx, vy, vz, yaw_rate = velocity(self.pieces, t)
+        yaw = evaluate(self.pieces, t)[3]
+        forward = vx * math.cos(yaw) + vy * math.sin(yaw)
+        left = -vx * math.sin(yaw) + vy * math.cos(yaw)
+        return float(forward), float(left), float(vz), math.degrees(yaw_rate)
+
+    def upload(self, cf, trajectory_id=config.MISSION_TRAJECTORY_ID):
+        """
+        Writes the trajectory to the trajectory memory and defines it on the high-level commander.
+        """
+
+        from cflib.crazyflie.mem import MemoryElement, Poly4D
+
+        memory = cf.mem.get_mems(MemoryElement.TYPE_TRAJ)[0]
+        if len(self.pieces) * PIECE_SIZE > memory.size:
+            raise Exception(f"Mission with {len(self.pieces)} pieces does not fit into the trajectory memory")
+
+        memory.trajectory = [
+            Poly4D(duration, *(Poly4D.Poly(row.tolist()) for row in coefficients))
+            for duration, coefficients in self.pieces
+        ]
+        if not memory.write_data_sync():
+            raise Exception("Upload of the mission trajectory failed")
+        cf.high_level_commander.define_trajectory(trajectory_id, 0, len(self.pieces))
+        print(f"🗺️ Mission uploaded: {len(self.pieces)} pieces, {self.duration:.1f} s")
+
+    def start(self, cf, trajectory_id=config.MISSION_TRAJECTORY_ID):
+        """
+        Starts the uploaded trajectory at the current position (does not wait for it).
+        """
+
+        cf.high_level_commander.start_trajectory(trajectory_id, relative=True)
+
+    def fly(self, cf, clock=control.CLOCK):
+        """
+        Takes off, flies the uploaded trajectory and lands with the high-level commander.
+        """
+
+        takeoff = travel_time(self.height, self.velocity)
+        cf.param.set_value("commander.enHighLevel", "1")
+        cf.param.set_value("kalman.resetEstimation", "1")
+        clock.sleep(0.1)
+        cf.param.set_value("kalman.resetEstimation", "0")
+        clock.sleep(2)
+
+        cf.high_level_commander.takeoff(self.height, takeoff)
+        clock.sleep(takeoff)
+        self.start(cf)
+        clock.sleep(self.duration)
+        cf.high_level_commander.land(0.0, takeoff)
+        clock.sleep(takeoff)
+        cf.high_level_commander.stop()
+
+
+def verify(mission, tolerance=TOLERANCE):
+    """
+    Flies the mission on the simulator and compares the pose at every waypoint with the script.
+    Returns the largest position and yaw error.
+    """
+
+    import replay
+    import simulator
+
+    clock = replay.ReplayClock()
+    cf = simulator.SimulatedCrazyflie(clock)
+    mission.upload(cf)
+
+    takeoff = travel_time(mission.height, mission.velocity)
+    cf.high_level_commander.takeoff(mission.height, takeoff)
+    clock.sleep(takeoff)
+    origin = cf.pose()
+    mission.start(cf)
+    start = clock.now()
+
+    position_error = yaw_error = 0.0
+    for t, expected in mission.waypoints:
+        clock.set(start + t)
+        error = cf.pose() - origin - expected
+        position_error = max(position_error, float(np.linalg.norm(error[:3])))
+        yaw_error = max(yaw_error, abs(float(error[3])))
+
+    if position_error > tolerance or yaw_error > tolerance:
+        raise Exception(f"Mission deviates from its script ({position_error:.3f} m, {yaw_error:.3f} rad)")
+    return position_error, yaw_error
+
+
+def main():
+    """
+    Verifies the POC route on the simulator, or flies it with --fly.
+    """
+
+    mission = Mission(ROUTE)
+    position_error, yaw_error = verify(mission)
+    print(f"✅ Mission verified on the simulator: max. error {position_error * 1000:.2f} mm, {math.degrees(yaw_error):.2f}°")
+
+    if "--fly" not in sys.argv[1:]:
+        return
+
+    import cflib.crtp
+    from cflib.crazyflie import Crazyflie
+    from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+
+    import debug
+
+    cflib.crtp.init_drivers()
+    with SyncCrazyflie(config.MY_URI, cf=Crazyflie(rw_cache="cache")) as scf:
+        scf.cf.platform.send_arming_request(True)
+        control.CLOCK.sleep(1.0)
+        mission.upload(scf.cf)
+        try:
+            mission.fly(scf.cf)
+        except Exception as e:
+            debug.main("error", e)
+            scf.cf.high_level_commander.stop()
+
+
+if __name__ == "__main__":
+    main()
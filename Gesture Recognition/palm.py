@@ -10,17 +10,11 @@ Purpose:
 """
 
 
-import time
 import math
 
-import cv2
-import cflib.crtp
-from cflib.crazyflie import Crazyflie
-from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
-from cflib.positioning.motion_commander import MotionCommander
-
 import config
-import debug
+import flight
+import vision
 
 
 class TagEvaluater:
@@ -32,6 +26,8 @@ class TagEvaluater:
         self.ids = None
         self.tags = []
         self.calibrated = False
+        self.inferred = False
+        self.tags_snapshot = None
         self.distance_snapshot = (None, None)
         self.distance = None
         self.area_snapshot = None
@@ -146,6 +142,15 @@ class TagEvaluater:
 
         self.y_middle = big_middle[1]
 
+    def complete(self, tags, ids):
+        """
+        Rebuilds a single missing tag from the snapshot layout.
+        Stores in self.inferred if the result is based on three tags only.
+        """
+
+        tags, ids, self.inferred = vision.infer_missing_tag(tags, ids, self.tags_snapshot)
+        return tags, ids
+
     def make_snapshot(self, tags, ids, cam):
         """
         Initiates the calibration process.
@@ -153,6 +158,8 @@ class TagEvaluater:
         """
 
         if ids is not None and all(_id in ids for _id in config.USED_TAGS):
+            id_list = [_id[0] for _id in ids]
+            self.tags_snapshot = {_id: tags[id_list.index(_id)].reshape(4, 2) for _id in id_list}
             _ = self.update(tags, ids)
             self.distance_snapshot = self.distance
 
@@ -195,47 +202,10 @@ class TagEvaluater:
 
 def main():
     """
-    Initiates all the classes.
-    Catches errors.
-    Connects to crazyflie with the MotionCommander
+    Flies with the TagEvaluater of this file (see flight.py).
     """
 
-    cam = config.Camera()
-    sw = config.Timer()
-    te = TagEvaluater()
-    controller = config.DroneController()
-
-    config.calibrate(te, cam)
-
-    cflib.crtp.init_drivers()
-    debug.main("deck")
-
-    try:
-        with SyncCrazyflie(config.MY_URI, cf=Crazyflie(rw_cache="cache")) as scf:
-            scf.cf.platform.send_arming_request(True)
-            time.sleep(1.0)
-            with MotionCommander(scf, default_height=config.DEFAULT_HEIGHT) as mc:
-                cam.open_cam()
-                sw.reset()
-                while controller.flying:
-                    if cv2.waitKey(1) == ord("q"):
-                        cam.close_cam()
-                        controller.land()
-                        break
-
-                    frame, corners, ids = cam.process_frame()
-                    if ids is not None and all(_id in ids for _id in config.USED_TAGS):
-                        sw.reset()
-                        direction = te.update(corners, ids)
-                    else:
-                        direction = (0, 0, 0)
-                        sw.safety_check(controller, cam)
-
-                    controller.determine_state(mc, direction)
-                    cam.show_feed(corners, ids, frame)
-
-    except Exception as e:
-        debug.handle_error(e)
+    flight.main(TagEvaluater)
 
 
 if __name__ == "__main__":
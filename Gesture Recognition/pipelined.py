@@ -0,0 +1,144 @@
+"""
+Date: 29.10.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Spreads the tag detection of consecutive frames over a pool of threads
+    - OpenCV releases the GIL inside the detection, so the threads run in parallel
+    - Results are handed out in frame order
+    - Chooses the pipeline depth by measuring throughput and latency
+"""
+
+import sys
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+import config
+import tracing
+import vision
+
+
+class PipelinedCamera(vision.Camera):
+    """
+    Camera that keeps up to depth frames in detection at the same time.
+    The depth starts at 1 and is increased as long as it raises the throughput noticeably.
+    Every frame is detected, the static-scene gate (vision.SceneGate) is not used:
+    the next frames are submitted before the detection they would be compared with is done.
+    """
+
+    detects_on_read = True
+
+    def __init__(self, workers=config.PIPELINE_WORKERS, max_depth=config.PIPELINE_MAX_DEPTH):
+        super().__init__()
+        self.workers = workers
+        self.max_depth = max_depth
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.local = threading.local() # detector parameters of every worker thread
+        self.pending = deque()
+        self.depth = 1
+        self.searching = True
+        self.best = (1, 0.0) # (depth, frames per second)
+        self.job_time = 0.0
+        self.window_start = None
+        self.delivered = 0
+        self.latency = 0.0
+
+    def open_cam(self, index=0):
+        """
+        Opens the camera and restarts the depth search.
+        """
+
+        super().open_cam(index)
+        self.pending.clear()
+        self.depth = 1
+        self.searching = True
+        self.best = (1, 0.0)
+        self.window_start = None
+
+    def close_cam(self):
+        """
+        Drops the frames still in the pipeline and closes the camera.
+        """
+
+        for _, _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        super().close_cam()
+
+    def _job(self, frame):
+        start = time.perf_counter()
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if not hasattr(self.local, "parameters"):
+            self.local.parameters = cv2.aruco.DetectorParameters()
+        corners, ids, recovered = self.detect_tags(gray_frame, self.local.parameters)
+        job_time = time.perf_counter() - start
+        tracing.complete("detect job", start, job_time)
+        return corners, ids, recovered, job_time # counted by the consumer, not by the worker threads
+
+    def process_frame(self, out=None):
+        """
+        Reads frames until the pipeline is filled up to its depth.
+        Returns the oldest frame together with its detection result.
+        """
+
+        while len(self.pending) < self.depth:
+            success, frame = self.cam.read()
+            if not success:
+                if self.pending:
+                    break
+                print("Cannot receive frame (stream end?). Exiting ...")
+                sys.exit()
+            self.pending.append((time.perf_counter(), frame, self.pool.submit(self._job, frame)))
+
+        submitted, frame, future = self.pending.popleft()
+        corners, ids, recovered, self.job_time = future.result()
+        self.recovered += recovered
+        self._measure(submitted)
+
+        if out is not None:
+            out[...] = frame
+            frame = out
+        return frame, corners, ids
+
+    def _measure(self, submitted):
+        now = time.perf_counter()
+        if self.window_start is None:
+            self.window_start = now
+            self.delivered = 0
+            self.latency = 0.0
+            return
+
+        self.delivered += 1
+        self.latency += now - submitted
+        if self.delivered < config.PIPELINE_WINDOW:
+            return
+
+        fps = self.delivered / (now - self.window_start)
+        latency = self.latency / self.delivered
+        self.window_start = None
+
+        if self.searching:
+            if fps > self.best[1] * 1.1 and self.depth < self.max_depth:
+                self.best = (self.depth, fps)
+                self.depth += 1
+                return
+            if fps > self.best[1] * 1.1:
+                self.best = (self.depth, fps)
+            self.depth = self.best[0]
+            self.searching = False
+
+        print(
+            f"🧵 Pipeline: depth {self.depth} with {self.workers} threads, "
+            f"{fps:.1f} fps at {latency * 1000:.0f} ms latency")
+
+    def frame_done(self, frame_time, corners, reused=None):
+        """
+        Reports the detection cost per delivered frame to the governor.
+        """
+
+        self.governor.update(self.job_time / min(self.workers, self.depth), corners)
@@ -0,0 +1,208 @@
+"""
+Date: 23.10.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Alternative to the TagEvaluater of palm.py and whole_hand.py
+    - Treats the four tags as one rigid board and estimates its pose with solvePnP
+    - Maps rotation and translation proportionally to velocities
+
+If executed directly, it will:
+    - Turn the synthetic palm layout of benchmark.py (right side closer to the camera)
+      and check that the TagEvaluater of palm.py and the PoseEvaluater yaw in the same direction
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+import config
+import vision
+
+
+PNP_FLAGS = {
+    "iterative": cv2.SOLVEPNP_ITERATIVE,
+    "ippe": cv2.SOLVEPNP_IPPE
+}
+
+
+class PoseEvaluater:
+    """
+    Handles the pose estimation of the hand.
+    The board geometry is taken from the calibration snapshot, so it works for every tag layout.
+    """
+
+    def __init__(self):
+        self.calibrated = False
+        self.inferred = False
+        self.tags_snapshot = None
+        self.camera_matrix = None
+        self.object_points = None
+        self.t_snapshot = None
+        self.rvec = None
+        self.tvec = None
+
+    def determine_tilt(self):
+        """
+        Converts the current pose into proportional velocities:
+            - tilt: upper half of the hand closer to the camera means forward
+            - yaw: right half of the (unflipped) image closer means turning right
+            - altitude: hand moved up or down compared to the snapshot
+        """
+
+        rotation, _ = cv2.Rodrigues(self.rvec)
+        tilt = math.asin(max(-1.0, min(1.0, rotation[2][1])))
+        yaw = math.asin(max(-1.0, min(1.0, rotation[2][0])))
+        height = self.t_snapshot[1] - self.tvec[1][0] # camera y-axis points down
+
+        v_til = self._proportional(tilt, config.PNP_T_DZ, config.PNP_T_MAX, config.VT)
+        v_alt = self._proportional(height, config.PNP_A_DZ, config.PNP_A_MAX, config.VA)
+        v_yaw = self._proportional(yaw, config.PNP_Y_DZ, config.PNP_Y_MAX, config.VY)
+
+        return (v_til, v_alt, v_yaw)
+
+    def _proportional(self, value, deadzone, full, velocity):
+        if abs(value) <= deadzone:
+            return 0
+        share = min((abs(value) - deadzone) / (full - deadzone), 1.0)
+        return math.copysign(velocity * share, value)
+
+    def _image_points(self, tags, ids):
+        id_list = [_id[0] for _id in ids]
+        points = [tags[id_list.index(_id)].reshape(4, 2) for _id in config.USED_TAGS]
+        return np.concatenate(points).astype(np.float64)
+
+    def complete(self, tags, ids):
+        """
+        Rebuilds a single missing tag from the snapshot layout.
+        Stores in self.inferred if the result is based on three tags only.
+        """
+
+        tags, ids, self.inferred = vision.infer_missing_tag(tags, ids, self.tags_snapshot)
+        return tags, ids
+
+    def make_snapshot(self, tags, ids, cam):
+        """
+        Initiates the calibration process.
+        Projects the 16 corners onto a plane at the calibration distance to get the board geometry.
+        """
+
+        if ids is not None and all(_id in ids for _id in config.USED_TAGS):
+            id_list = [_id[0] for _id in ids]
+            self.tags_snapshot = {_id: tags[id_list.index(_id)].reshape(4, 2) for _id in id_list}
+            self.camera_matrix = cam.camera_matrix()
+            points = self._image_points(tags, ids)
+
+            fx, fy = self.camera_matrix[0][0], self.camera_matrix[1][1]
+            cx, cy = self.camera_matrix[0][2], self.camera_matrix[1][2]
+            z = config.CALIBRATION_DISTANCE
+
+            board = np.zeros((len(points), 3))
+            board[:, 0] = (points[:, 0] - cx) * z / fx
+            board[:, 1] = (points[:, 1] - cy) * z / fy
+            centre = board.mean(axis=0)
+
+            self.object_points = board - centre
+            self.t_snapshot = np.array([centre[0], centre[1], z])
+            self.rvec = np.zeros((3, 1))
+            self.tvec = self.t_snapshot.reshape(3, 1).copy()
+
+            reference_marker = points[config.USED_TAGS.index(4) * 4:][:4]
+            tl = reference_marker[0]
+            br = reference_marker[2]
+            start_point = (int(tl[0] - 10), int(tl[1] - 10))
+            end_point = (int(br[0] + 10), int(br[1] + 10))
+            cam.reference = [start_point, end_point]
+
+            self.calibrated = True
+
+    def update(self, tags, ids):
+        """
+        Solves the pose of the board in one solvePnP call.
+        The iterative solver is warm-started with the pose of the previous frame.
+        Returns the calculated velocity tuple.
+        """
+
+        if not self.calibrated:
+            return None
+
+        points = self._image_points(tags, ids)
+        if config.PNP_METHOD == "iterative":
+            success, rvec, tvec = cv2.solvePnP(
+                self.object_points, points, self.camera_matrix, None,
+                rvec=self.rvec.copy(), tvec=self.tvec.copy(),
+                useExtrinsicGuess=True, flags=PNP_FLAGS["iterative"])
+        else:
+            success, rvec, tvec = cv2.solvePnP(
+                self.object_points, points, self.camera_matrix, None,
+                flags=PNP_FLAGS[config.PNP_METHOD])
+
+        if not success:
+            return (0, 0, 0)
+
+        self.rvec = rvec
+        self.tvec = tvec
+        return self.determine_tilt()
+
+
+def turned_tags(cam, angle):
+    """
+    Returns the corners of the benchmark palm layout turned by angle (radians) around the vertical axis
+    at the calibration distance, projected with the camera matrix. A positive angle brings the right side closer.
+    """
+
+    import benchmark
+
+    size, positions = benchmark.layout(*cam.size)
+    matrix = cam.camera_matrix()
+    fx, fy, cx, cy = matrix[0][0], matrix[1][1], matrix[0][2], matrix[1][2]
+    z = config.CALIBRATION_DISTANCE
+
+    tags = []
+    for _id in config.USED_TAGS:
+        x, y = positions[_id]
+        corners = np.array([(x, y), (x + size, y), (x + size, y + size), (x, y + size)], dtype=np.float64)
+        board_x = (corners[:, 0] - cx) * z / fx
+        board_y = (corners[:, 1] - cy) * z / fy
+        turned_x = board_x * math.cos(angle)
+        turned_z = z - board_x * math.sin(angle)
+        image = np.stack([turned_x / turned_z * fx + cx, board_y / turned_z * fy + cy], axis=1)
+        tags.append(image.reshape(1, 4, 2).astype(np.float32))
+    return tags, np.array([[_id] for _id in config.USED_TAGS])
+
+
+def yaw_signs(angle=0.3, size=(1280, 720)):
+    """
+    Calibrates both evaluaters on the flat layout and returns their yaw velocities for the turned one.
+    """
+
+    import palm
+
+    cam = vision.Camera()
+    cam.size = size
+    flat = turned_tags(cam, 0.0)
+    turned = turned_tags(cam, angle)
+
+    velocities = []
+    for evaluater in (palm.TagEvaluater(), PoseEvaluater()):
+        evaluater.make_snapshot(*flat, cam)
+        velocities.append(evaluater.update(*turned)[2])
+    return velocities
+
+
+def main():
+    """
+    Checks that both evaluaters turn the same way.
+    """
+
+    tag_yaw, pose_yaw = yaw_signs()
+    if tag_yaw == 0 or pose_yaw == 0 or (tag_yaw > 0) != (pose_yaw > 0):
+        print(f"❌ Yaw directions differ: TagEvaluater {tag_yaw}, PoseEvaluater {pose_yaw}")
+        raise SystemExit(1)
+    print(f"✅ Right side closer → yaw {tag_yaw} (TagEvaluater), {pose_yaw:.2f} (PoseEvaluater)")
+
+
+if __name__ == "__main__":
+    main()
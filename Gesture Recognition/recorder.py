@@ -0,0 +1,295 @@
+"""
+Date: 07.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Records a flight: frames, detections, evaluator outputs, commands and telemetry
+    - All records share one monotonic clock (control.CLOCK, like the rest of the project)
+    - Calibration frames and key presses are recorded too, so replay.py can rerun a whole session
+    - A background thread writes the records into chunked, append-only files
+    - An index file allows the FlightReader to seek by time without scanning the chunks
+"""
+
+import os
+import queue
+import pickle
+import threading
+
+import cv2
+import numpy as np
+
+import config
+import control
+
+
+KINDS = ["frame", "detection", "evaluation", "command", "telemetry", "snapshot", "session", "key"]
+INDEX_DTYPE = np.dtype([
+    ("time", np.float64),
+    ("kind", np.uint8),
+    ("chunk", np.uint32),
+    ("offset", np.uint64),
+    ("length", np.uint32)
+])
+
+
+class FlightRecorder:
+    """
+    Collects records from the flight loop without blocking it.
+    Records are dropped (and counted) if the writer cannot keep up.
+    Every recording needs its own folder, an existing one is never mixed with a new flight.
+    """
+
+    def __init__(self, path, frames=config.RECORD_FRAMES, max_bytes=config.RECORD_QUEUE_BYTES):
+        if os.path.isdir(path) and os.listdir(path):
+            raise IOError(f"Recording folder {path} is not empty")
+
+        self.path = path
+        self.frames = frames
+        self.records = queue.Queue(maxsize=config.RECORD_QUEUE_SIZE)
+        self.max_bytes = max_bytes
+        self.queued_bytes = 0 # bytes of the frames in the queue
+        self.bytes_lock = threading.Lock()
+        self.dropped = 0
+        self.chunk = -1
+        self.chunk_file = None
+        self.offset = 0
+
+        os.makedirs(path, exist_ok=True)
+        self.index_file = open(os.path.join(path, "index.bin"), "wb")
+        self.writer = threading.Thread(target=self._write, name="recorder", daemon=True)
+        self.writer.start()
+
+    def now(self):
+        """
+        Returns the time of the shared clock.
+        """
+
+        return control.CLOCK.now()
+
+    def record(self, kind, payload, timestamp=None):
+        """
+        Queues a record for the writer.
+        Returns False if it was dropped.
+        """
+
+        if timestamp is None:
+            timestamp = self.now()
+        try:
+            self.records.put_nowait((timestamp, KINDS.index(kind), payload))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def record_frame(self, frame, timestamp=None):
+        """
+        Queues a copy of the frame; it is compressed by the writer thread.
+        The frame is dropped while the queued frames would exceed max_bytes.
+        """
+
+        if self.frames is None:
+            return
+
+        with self.bytes_lock:
+            if self.queued_bytes + frame.nbytes > self.max_bytes:
+                self.dropped += 1
+                return
+            self.queued_bytes += frame.nbytes
+        if not self.record("frame", frame.copy(), timestamp):
+            with self.bytes_lock:
+                self.queued_bytes -= frame.nbytes
+
+    def record_detection(self, corners, ids, timestamp=None):
+        """
+        Queues the raw detection result of a frame.
+        """
+
+        ids = None if ids is None else np.array(ids)
+        self.record("detection", ([np.array(corner) for corner in corners], ids), timestamp)
+
+    def attach(self, telemetry_recorder):
+        """
+        Records every sample of a telemetry.TelemetryRecorder.
+        """
+
+        telemetry_recorder.add_callback(
+            lambda stamp, data: self.record("telemetry", (stamp, dict(data))))
+
+    def tap(self, mc):
+        """
+        Returns a stand-in for the MotionCommander that records all commands.
+        """
+
+        return CommandTap(mc, self)
+
+    def close(self, timeout=config.RECORD_CLOSE_TIMEOUT):
+        """
+        Writes the remaining records and closes all files.
+        Gives up after timeout seconds if the writer is stuck or gone (the flight is over, nothing may hang).
+        """
+
+        try:
+            self.records.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.writer.join(timeout)
+        if self.writer.is_alive():
+            print("⚠️ Recorder: writer did not finish, the recording is incomplete")
+            return # the files still belong to the writer
+        self.index_file.close()
+        if self.chunk_file is not None:
+            self.chunk_file.close()
+        if self.dropped:
+            print(f"⚠️ Recorder: {self.dropped} records dropped (writer too slow)")
+
+    def _encode(self, kind, payload):
+        if KINDS[kind] == "frame" and self.frames == "jpeg":
+            _, data = cv2.imencode(".jpg", payload, [cv2.IMWRITE_JPEG_QUALITY, 80])
+            payload = ("jpeg", data.tobytes())
+        elif KINDS[kind] == "frame":
+            payload = ("raw", payload)
+        return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _write(self):
+        while True:
+            item = self.records.get()
+            if item is None:
+                return
+
+            timestamp, kind, payload = item
+            data = self._encode(kind, payload)
+            if KINDS[kind] == "frame":
+                with self.bytes_lock:
+                    self.queued_bytes -= payload.nbytes
+            if self.chunk_file is None or self.offset + len(data) > config.RECORD_CHUNK_SIZE:
+                self._next_chunk()
+
+            self.chunk_file.write(data)
+            entry = np.array([(timestamp, kind, self.chunk, self.offset, len(data))], dtype=INDEX_DTYPE)
+            self.index_file.write(entry.tobytes())
+            self.offset += len(data)
+
+            if self.records.empty():
+                self.chunk_file.flush()
+                self.index_file.flush()
+
+    def _next_chunk(self):
+        if self.chunk_file is not None:
+            self.chunk_file.close()
+        self.chunk += 1
+        self.chunk_file = open(self._chunk_path(self.path, self.chunk), "wb")
+        self.offset = 0
+
+    @staticmethod
+    def _chunk_path(path, chunk):
+        return os.path.join(path, f"chunk_{chunk:05d}.bin")
+
+
+class CommandTap:
+    """
+    Forwards everything to the MotionCommander and records the motion commands.
+    """
+
+    def __init__(self, mc, recorder):
+        self._mc = mc
+        self._recorder = recorder
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Records and forwards a linear motion.
+        """
+
+        self._recorder.record(
+            "command", ("start_linear_motion", (velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw)))
+        self._mc.start_linear_motion(velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=rate_yaw)
+
+    def stop(self):
+        """
+        Records and forwards a stop.
+        """
+
+        self._recorder.record("command", ("stop", ()))
+        self._mc.stop()
+
+    def land(self):
+        """
+        Records and forwards a landing.
+        """
+
+        self._recorder.record("command", ("land", ()))
+        self._mc.land()
+
+    def __getattr__(self, name):
+        return getattr(self._mc, name)
+
+
+class FlightReader:
+    """
+    Reads a recording.
+    Only the small index is loaded, so seeking by time is a binary search.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = np.fromfile(os.path.join(path, "index.bin"), dtype=INDEX_DTYPE)
+        order = np.argsort(self.index["time"], kind="stable")
+        self.index = self.index[order] # the writer may get records slightly out of order
+        self.files = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def seek(self, timestamp):
+        """
+        Returns the position of the first record at or after timestamp.
+        """
+
+        return int(np.searchsorted(self.index["time"], timestamp))
+
+    def read(self, position):
+        """
+        Returns (time, kind, payload) of the record at position.
+        Frames are decoded to images.
+        """
+
+        entry = self.index[position]
+        chunk = int(entry["chunk"])
+        if chunk not in self.files:
+            self.files[chunk] = open(FlightRecorder._chunk_path(self.path, chunk), "rb")
+
+        file = self.files[chunk]
+        file.seek(int(entry["offset"]))
+        payload = pickle.loads(file.read(int(entry["length"])))
+
+        kind = KINDS[entry["kind"]]
+        if kind == "frame":
+            frame_format, data = payload
+            if frame_format == "jpeg":
+                payload = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            else:
+                payload = data
+
+        return float(entry["time"]), kind, payload
+
+    def records(self, kinds=None, start=None, end=None):
+        """
+        Yields the records between start and end (times), optionally only of some kinds.
+        """
+
+        first = 0 if start is None else self.seek(start)
+        last = len(self) if end is None else self.seek(end)
+        wanted = None if kinds is None else [KINDS.index(kind) for kind in kinds]
+
+        for position in range(first, last):
+            if wanted is None or self.index[position]["kind"] in wanted:
+                yield self.read(position)
+
+    def close(self):
+        """
+        Closes all chunk files.
+        """
+
+        for file in self.files.values():
+            file.close()
+        self.files = {}
@@ -0,0 +1,164 @@
+"""
+Date: 12.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Catches changes of the flight behaviour (determine_tilt, _y_center, calibration, ...)
+    - Replays every stored session through calibration and the current evaluator of its script
+      (palm or whole_hand, the tag layouts differ)
+    - Compares the command streams with the golden outputs stored next to the recordings
+    - Summarises divergences per session and axis and reports the evaluation cost
+      (a single replay is too short for a reliable timing, so the cost does not fail the check)
+    - Sessions are replayed in parallel (one process per session)
+
+If executed directly, it will:
+    - Check the recordings given as arguments (--update stores the current outputs as golden)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+import replay
+
+
+AXES = {"tilt": 0, "altitude": 2, "yaw": 3} # position in the start_linear_motion arguments
+GOLDEN_FILE = "golden.json"
+
+
+class TimedEvaluater:
+    """
+    Forwards everything to an evaluator and measures the time of its update calls.
+    """
+
+    def __init__(self, te):
+        self._te = te
+        self.calls = 0
+        self.total = 0.0
+
+    def update(self, tags, ids):
+        """
+        Times and forwards an update.
+        """
+
+        start = time.perf_counter()
+        result = self._te.update(tags, ids)
+        self.total += time.perf_counter() - start
+        self.calls += 1
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._te, name)
+
+
+def run_session(path):
+    """
+    Replays one recording with the current evaluator of the recorded script.
+    Returns {script: {"commands": [...], "cost_us": mean update time}}.
+    """
+
+    session, frames, flight_start, _ = replay.load_session(path)
+    module = session["module"]
+    te = TimedEvaluater(getattr(importlib.import_module(module), session["evaluater"])())
+    commands = replay.replay(session, frames, flight_start, te)
+    return {
+        module: {
+            "commands": [[name, list(args)] for name, args in commands],
+            "cost_us": te.total / te.calls * 1e6 if te.calls else 0.0
+        }
+    }
+
+
+def diff(golden, current):
+    """
+    Compares two command streams.
+    Returns the first differing command, the number of differing commands per axis,
+    the number of differing command types (motion/stop) and the length difference.
+    """
+
+    first = None
+    axes = dict.fromkeys(AXES, 0)
+    kinds = 0
+    for i, (old, new) in enumerate(zip(golden, current)):
+        if old == new:
+            continue
+        if first is None:
+            first = i
+        if old[0] != new[0]:
+            kinds += 1
+            continue
+        for axis, position in AXES.items():
+            if old[1][position] != new[1][position]:
+                axes[axis] += 1
+
+    length = len(current) - len(golden)
+    if first is None and length:
+        first = min(len(golden), len(current))
+    return {"first": first, "axes": axes, "kinds": kinds, "length": length}
+
+
+def check(paths, update=False, workers=None):
+    """
+    Replays all recordings and compares (or stores) the golden outputs.
+    Returns True if nothing diverged.
+    """
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_session, paths))
+
+    passed = True
+    for path, outputs in zip(paths, results):
+        golden_path = os.path.join(path, GOLDEN_FILE)
+        name = os.path.basename(os.path.normpath(path))
+
+        if update or not os.path.exists(golden_path):
+            with open(golden_path, "w", encoding="utf-8") as file:
+                json.dump(outputs, file)
+            print(f"💾 {name}: golden output stored")
+            continue
+
+        with open(golden_path, "r", encoding="utf-8") as file:
+            golden = json.load(file)
+
+        for evaluater, output in outputs.items():
+            if evaluater not in golden:
+                print(f"❔ {name} / {evaluater}: no golden output (run with --update)")
+                continue
+
+            result = diff(golden[evaluater]["commands"], output["commands"])
+            timing = f"{output['cost_us']:.0f} µs/frame (golden {golden[evaluater]['cost_us']:.0f} µs)"
+
+            if result["first"] is None:
+                print(f"✅ {name} / {evaluater}: identical, {timing}")
+            else:
+                axes = ", ".join(f"{axis} {count}" for axis, count in result["axes"].items())
+                print(
+                    f"❌ {name} / {evaluater}: diverges at command #{result['first']} "
+                    f"({axes}, motion/stop {result['kinds']}, length {result['length']:+d}), {timing}")
+            passed = passed and result["first"] is None
+
+    return passed
+
+
+def main():
+    """
+    Checks the given recordings against their golden outputs.
+    """
+
+    parser = argparse.ArgumentParser(description="Evaluator regression check on recorded sessions")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--update", action="store_true", help="store the current outputs as golden")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    if not check(args.recordings, args.update, args.workers):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Date: 09.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Replays a flight recording (see recorder.py) faster than real time
+    - Runs the recorded detections through the calibration, the evaluator, the safety timer
+      and the stream of the gesture loop, with a simulated MotionCommander
+    - Time only moves with the recording (ReplayClock), so the replay is deterministic
+    - Compares the replayed commands with the recorded ones (they must be identical)
+    - Only flights of the stream (config.RUNTIME = "stream") can be replayed: the asyncio runtime
+      (runtime.py) interleaves frames and control on the real clock, which the replay can't reproduce
+
+If executed directly, it will:
+    - Replay the recording given as argument (or config.RECORD_DIR) and print the result
+"""
+
+import sys
+import time
+import importlib
+
+import numpy as np
+
+import config
+import control
+import intrinsics
+import recorder
+import stream
+import vision
+
+
+class ReplayFinished(Exception):
+    """
+    Raised by the ReplayCamera when the recording has no frames left.
+    """
+
+
+class ReplayClock(control.Clock):
+    """
+    Clock that is set to the recorded times instead of following the real time.
+    Sleeping only moves the clock forward.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+
+    def now(self):
+        """
+        Returns the current replay time.
+        """
+
+        return self.time
+
+    def wall(self):
+        """
+        Returns the current replay time (there is no wall clock in a replay).
+        """
+
+        return self.time
+
+    def sleep(self, seconds):
+        """
+        Moves the replay time forward without waiting.
+        """
+
+        self.time += seconds
+
+    def set(self, timestamp):
+        """
+        Sets the replay time to a recorded time.
+        """
+
+        self.time = timestamp
+
+
+class ReplayCamera(vision.Camera):
+    """
+    Camera that hands out the recorded detections instead of reading frames.
+    Sets the clock to the recorded time of every frame and returns the keys pressed with it.
+    """
+
+    detects_on_read = True
+
+    def __init__(self, frames, size, clock):
+        super().__init__()
+        self.frames = frames
+        self.size = size
+        self.clock = clock
+        self.position = 0
+        self.keys = []
+        self.blank = np.zeros((8, 8, 3), dtype=np.uint8) # stand-in frame, nothing is displayed
+
+    def open_cam(self, index=0):
+        """
+        Loads the lens correction of the recorded resolution (only once).
+        """
+
+        self.gate.clear()
+        if self.undistorter is None:
+            self.undistorter = intrinsics.create_undistorter(index, *self.size)
+
+    def close_cam(self):
+        """
+        Nothing to close.
+        """
+
+    def process_frame(self, out=None):
+        """
+        Returns the next recorded detection.
+        Raises ReplayFinished at the end of the recording.
+        """
+
+        if self.position == len(self.frames):
+            raise ReplayFinished()
+
+        timestamp, corners, ids, reused, keys = self.frames[self.position]
+        self.position += 1
+        self.clock.set(timestamp)
+        self.gate.reused = reused
+        self.keys = list(keys)
+        return self.blank, corners, ids
+
+    def key(self):
+        """
+        Returns the next key recorded with the current frame (-1 if none).
+        """
+
+        return self.keys.pop(0) if self.keys else -1
+
+    def frame_done(self, frame_time, corners, reused=None):
+        """
+        The governor has no influence on recorded detections.
+        """
+
+    def show_feed(self, corners, ids, feed_frame):
+        """
+        The replay is headless.
+        """
+
+
+class SimulatedMotionCommander:
+    """
+    Stand-in for the MotionCommander that collects the motion commands.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def start_linear_motion(self, velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw=0.0):
+        """
+        Collects a linear motion.
+        """
+
+        self.commands.append(
+            ("start_linear_motion", (velocity_x_m, velocity_y_m, velocity_z_m, rate_yaw)))
+
+    def stop(self):
+        """
+        Collects a stop.
+        """
+
+        self.commands.append(("stop", ()))
+
+    def land(self):
+        """
+        Collects a landing.
+        """
+
+        self.commands.append(("land", ()))
+
+
+def load_session(path):
+    """
+    Reads the parts of a recording needed for a replay.
+    Returns the session record, the frames [(time, corners, ids, reused, keys)],
+    the start time of the flight and the recorded commands.
+    """
+
+    reader = recorder.FlightReader(path)
+    session = None
+    frames = []
+    flight_start = None
+    commands = []
+
+    kinds = ["session", "detection", "evaluation", "key", "snapshot", "command"]
+    for timestamp, kind, payload in reader.records(kinds):
+        if kind == "session":
+            session = payload
+        elif kind == "detection":
+            corners, ids = payload
+            frames.append([timestamp, tuple(corners), ids, False, []])
+        elif kind == "evaluation" and frames:
+            frames[-1][3] = payload[2]
+        elif kind == "key" and frames:
+            frames[-1][4].append(payload)
+        elif kind == "snapshot" and flight_start is None:
+            flight_start = timestamp
+        elif kind == "command":
+            commands.append(payload)
+    reader.close()
+
+    if session is None:
+        raise ValueError(f"{path} has no session record (recorded without calibration)")
+    return session, [tuple(frame) for frame in frames], flight_start, commands
+
+
+def replay(session, frames, flight_start, te=None):
+    """
+    Runs a recorded session through calibration and the gesture stream as fast as possible.
+    Uses the recorded evaluator unless another one is given.
+    Returns the commands sent to the simulated MotionCommander.
+    Raises a ValueError for recordings of the asyncio runtime.
+    """
+
+    runtime = session.get("runtime", "stream") # recorded before the runtime was stored: stream
+    if runtime != "stream":
+        raise ValueError(f"recorded with the {runtime} runtime, only stream recordings can be replayed")
+
+    clock = ReplayClock()
+    cam = ReplayCamera(frames, session["size"], clock)
+    if te is None:
+        te = getattr(importlib.import_module(session["module"]), session["evaluater"])()
+    controller = control.DroneController(clock=clock)
+    sw = control.Timer(clock=clock)
+    mc = SimulatedMotionCommander()
+    if session.get("queue", False): # flown with the command queue: lands through mc like the recorded flight
+        controller.queue = mc
+
+    settings = (config.STREAM_THREADED, config.STREAM_DISPLAY, config.STREAM_REPORT)
+    config.STREAM_THREADED, config.STREAM_DISPLAY, config.STREAM_REPORT = [], False, False
+    try:
+        vision.calibrate(te, cam, clock=clock)
+        if flight_start is not None:
+            clock.set(flight_start)
+            cam.open_cam()
+            stream.gesture_stream(cam, te, controller, sw, mc).run()
+    except ReplayFinished:
+        pass
+    finally:
+        config.STREAM_THREADED, config.STREAM_DISPLAY, config.STREAM_REPORT = settings
+
+    return mc.commands
+
+
+def compare(recorded, replayed):
+    """
+    Returns the index of the first differing command, or None if both are identical.
+    """
+
+    for i, (a, b) in enumerate(zip(recorded, replayed)):
+        if a != b:
+            return i
+    if len(recorded) != len(replayed):
+        return min(len(recorded), len(replayed))
+    return None
+
+
+def main():
+    """
+    Replays a recording and checks that the commands are reproduced exactly.
+    """
+
+    path = sys.argv[1] if len(sys.argv) > 1 else config.RECORD_DIR
+    if path is None:
+        print("Usage: python replay.py <recording>")
+        sys.exit(1)
+
+    session, frames, flight_start, recorded = load_session(path)
+    start = time.perf_counter()
+    try:
+        replayed = replay(session, frames, flight_start)
+    except ValueError as e:
+        print(f"❌ {path}: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    duration = frames[-1][0] - frames[0][0] if frames else 0.0
+    print(
+        f"🔁 Replayed {len(frames)} frames ({duration:.1f} s) in {elapsed:.2f} s "
+        f"({duration / max(elapsed, 1e-9):.0f}x real time)")
+
+    mismatch = compare(recorded, replayed)
+    if mismatch is None:
+        print(f"✅ {len(replayed)} commands identical")
+    else:
+        print(f"❌ Commands differ at #{mismatch} of {len(recorded)} recorded / {len(replayed)} replayed")
+        print(f"    recorded: {recorded[mismatch] if mismatch < len(recorded) else None}")
+        print(f"    replayed: {replayed[mismatch] if mismatch < len(replayed) else None}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
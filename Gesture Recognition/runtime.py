@@ -0,0 +1,283 @@
+"""
+Date: 03.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Alternative to stream.py (config.RUNTIME = "asyncio")
+    - Runs frame acquisition, command ticks, telemetry, safety watchdog and operator input
+      as tasks on one asyncio event loop instead of a mix of sleeps and threads
+    - Blocking camera work (capture, detection and the feed window) is offloaded to an executor
+    - A failing frame task lands the drone right away instead of flying on the last direction
+    - Collects latency metrics for every task
+"""
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import autonomy
+import config
+import telemetry
+import tracing
+
+
+class TaskMetrics:
+    """
+    Run time and scheduling lag of one task.
+    Lag is how late a periodic task woke up or how long an event waited in its queue.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+        self.lag_total = 0.0
+        self.lag_worst = 0.0
+
+    def add(self, duration, lag=0.0):
+        """
+        Adds one run of the task.
+        """
+
+        self.count += 1
+        self.total += duration
+        self.worst = max(self.worst, duration)
+        self.lag_total += lag
+        self.lag_worst = max(self.lag_worst, lag)
+
+    def report(self):
+        """
+        Returns the metrics as a readable line.
+        """
+
+        if not self.count:
+            return f"    - {self.name:<10} never ran"
+        return (
+            f"    - {self.name:<10} {self.count:>6} runs, "
+            f"mean {self.total / self.count * 1000:6.2f} ms (max {self.worst * 1000:6.2f} ms), "
+            f"lag {self.lag_total / self.count * 1000:6.2f} ms (max {self.lag_worst * 1000:6.2f} ms)")
+
+
+class GestureRuntime:
+    """
+    Event loop version of the gesture loop in palm.py and whole_hand.py.
+    """
+
+    def __init__(self, cam, te, controller, sw, mc, scf=None, flight_recorder=None, telemetry_recorder=None):
+        self.cam = cam
+        self.te = te
+        self.controller = controller
+        self.sw = sw
+        self.scf = scf
+        self.flight_recorder = flight_recorder
+        self.controller.mc = mc
+
+        self.loop = None
+        self.done = None
+        self.inputs = None
+        self.telemetry_queue = None
+        self.recorder = telemetry_recorder # shared (started and stopped by the caller) if given
+        self.owns_recorder = telemetry_recorder is None
+        self.executor = ThreadPoolExecutor(max_workers=1) # the camera is used by one thread only
+        self.direction = (0, 0, 0)
+        self.live = True
+        self.pilot = autonomy.Autopilot()
+        self.telemetry = {}
+        self.metrics = {
+            name: TaskMetrics(name)
+            for name in ("frames", "commands", "telemetry", "watchdog", "input")
+        }
+
+    def stop(self):
+        """
+        Ends all tasks.
+        """
+
+        self.done.set()
+
+    def press(self, key):
+        """
+        Thread-safe entry for operator input (e.g. a pynput listener).
+        """
+
+        tracing.instant("key", {"key": str(key)})
+        self.loop.call_soon_threadsafe(self.inputs.put_nowait, (time.perf_counter(), key))
+
+    def _on_log(self, _, data):
+        # called by a cflib thread, possibly with a sample from before remove_callback()
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(
+            self.telemetry_queue.put_nowait, (time.perf_counter(), data))
+
+    def _process(self):
+        # runs in the executor
+        frame_start = time.perf_counter()
+        frame, corners, ids = self.cam.process_frame()
+        tags, tag_ids = self.te.complete(self.cam.undistort(corners), ids)
+
+        valid = tag_ids is not None and all(_id in tag_ids for _id in config.USED_TAGS)
+        direction = None
+        if valid and not self.cam.gate.reused:
+            direction = self.te.update(tags, tag_ids)
+
+        if self.flight_recorder is not None:
+            self.flight_recorder.record_frame(frame)
+            self.flight_recorder.record_detection(corners, ids)
+
+        elapsed = time.perf_counter() - frame_start
+        tracing.complete("process", frame_start, elapsed)
+        cost = elapsed - self.cam.read_time # the capture wait is not processing cost
+        return frame, corners, ids, valid, direction, cost
+
+    def _display(self, frame, corners, ids, mode):
+        # runs in the executor: imshow and waitKey block for milliseconds
+        self.cam.show_feed(corners, ids, autonomy.draw_mode(frame, mode))
+        return self.cam.key()
+
+    async def _frames(self):
+        try:
+            await self._frame_loop()
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            # without frames the commands would repeat the last direction until the watchdog expires
+            print("⚠️ Frame task failed → landing")
+            self.controller.request_land()
+            self.stop()
+            raise
+
+    async def _frame_loop(self):
+        metrics = self.metrics["frames"]
+        while not self.done.is_set():
+            start = time.perf_counter()
+            frame, corners, ids, valid, direction, cost = await self.loop.run_in_executor(
+                self.executor, self._process)
+
+            if valid:
+                if direction is not None: # unchanged frames keep the last velocities
+                    self.direction = direction
+            else:
+                self.direction = (0, 0, 0)
+            self.live = self.pilot.live(ids, valid)
+            if self.live or self.pilot.active:
+                self.sw.reset()
+            self.cam.frame_done(cost, corners)
+            if self.flight_recorder is not None:
+                self.flight_recorder.record(
+                    "evaluation", (self.direction, self.te.inferred, self.cam.gate.reused))
+
+            if config.STREAM_DISPLAY:
+                key = await self.loop.run_in_executor(
+                    self.executor, self._display, frame, corners, ids, self.pilot.mode)
+                if key == ord("q"):
+                    self.inputs.put_nowait((time.perf_counter(), "q"))
+
+            metrics.add(time.perf_counter() - start)
+
+    async def _every(self, name, period, func):
+        metrics = self.metrics[name]
+        next_time = self.loop.time()
+        while not self.done.is_set():
+            next_time += period
+            await asyncio.sleep(max(0.0, next_time - self.loop.time()))
+            lag = self.loop.time() - next_time
+
+            start = time.perf_counter()
+            func()
+            tracing.complete(name, start, time.perf_counter() - start)
+            metrics.add(time.perf_counter() - start, lag)
+
+    def _command(self):
+        if self.controller.flying:
+            self.controller.move(self.pilot.step(self.live, self.direction, self.sw.clock.now()))
+
+    def _watchdog(self):
+        if not self.controller.flying: # e.g. esc of the keyboard source
+            self.stop()
+        elif self.sw.expired():
+            print("⚠️ Hand gone for too long → landing")
+            self.controller.request_land()
+            self.stop()
+
+    async def _input(self):
+        metrics = self.metrics["input"]
+        while True:
+            received, key = await self.inputs.get()
+            start = time.perf_counter()
+            if key == "q":
+                self.controller.request_land()
+                self.stop()
+            metrics.add(time.perf_counter() - start, start - received)
+
+    async def _telemetry(self):
+        metrics = self.metrics["telemetry"]
+        while True:
+            received, data = await self.telemetry_queue.get()
+            start = time.perf_counter()
+            self.telemetry.update(data)
+            metrics.add(time.perf_counter() - start, start - received)
+
+    def _start_logging(self):
+        if self.recorder is not None:
+            self.recorder.add_callback(self._on_log)
+            return
+        if self.scf is None or not config.TELEMETRY_VARIABLES:
+            return
+
+        self.recorder = telemetry.TelemetryRecorder(
+            config.TELEMETRY_VARIABLES, path=config.TELEMETRY_DIR, period=config.TELEMETRY_PERIOD)
+        self.recorder.add_callback(self._on_log)
+        if self.flight_recorder is not None:
+            self.flight_recorder.attach(self.recorder)
+        self.recorder.start(self.scf)
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.done = asyncio.Event()
+        self.inputs = asyncio.Queue()
+        self.telemetry_queue = asyncio.Queue()
+        self._start_logging()
+        self.sw.reset()
+        self.pilot.reset(self.sw.clock.now())
+        if self.flight_recorder is not None:
+            self.flight_recorder.record(
+                "snapshot", {"tags": self.te.tags_snapshot, "size": self.cam.size})
+
+        tasks = [
+            asyncio.create_task(self._frames()),
+            asyncio.create_task(self._every("commands", config.COMMAND_PERIOD, self._command)),
+            asyncio.create_task(self._every("watchdog", config.WATCHDOG_PERIOD, self._watchdog)),
+            asyncio.create_task(self._input()),
+            asyncio.create_task(self._telemetry())
+        ]
+
+        await self.done.wait()
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for result in results: # e.g. the camera error that ended the frame task
+            if isinstance(result, BaseException) and not isinstance(result, asyncio.CancelledError):
+                raise result
+
+    def run(self):
+        """
+        Runs the event loop until the operator quits or the watchdog lands the drone.
+        Lands, closes the camera and prints the task metrics at the end.
+        """
+
+        try:
+            asyncio.run(self._main())
+        finally:
+            self.controller.land()
+            if self.recorder is not None:
+                self.recorder.remove_callback(self._on_log) # the event loop is closed
+                if self.owns_recorder:
+                    self.recorder.stop()
+            self.executor.shutdown(wait=True)
+            self.cam.close_cam()
+            print("⏱️ Task metrics:")
+            for metrics in self.metrics.values():
+                print(metrics.report())
@@ -0,0 +1,471 @@
+"""
+Date: 18.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Stand-in for a connected Crazyflie (no radio, no hardware, ideal setpoint tracking)
+    - Uses the real cflib commanders, so every command goes through send_packet
+    - Logs every packet with its time and sending thread
+    - Integrates hover setpoints into a position and counts setpoint gaps longer than the firmware timeout
+    - Trajectory memory and high-level commander (take off, land, stop, define and start trajectory),
+      so uploaded missions (mission.py) can be flown and checked
+
+If executed directly, it will:
+    - With --check: only run the quick safety check (DirectCommander, command queue, about 30 s)
+      and exit with 1 if it fails
+    - Otherwise compare the command-to-radio latency of the MotionCommander and the DirectCommander
+    - Measure the latency from a land request (other thread) and from an expired safety timer (command loop)
+      to the radio while motion commands flood the channel, with the command queue and with the old loop
+      (flag + command pace), and fail if the queue exceeds config.SAFETY_LATENCY
+"""
+
+import sys
+import math
+import time
+import random
+import struct
+import itertools
+import threading
+import statistics
+
+import numpy as np
+
+from cflib.crazyflie.commander import Commander
+from cflib.crazyflie.high_level_commander import HighLevelCommander
+from cflib.crtp.crtpstack import CRTPPort
+from cflib.utils.callbacks import Caller
+
+from cflib.crazyflie.mem import MemoryElement
+from cflib.crazyflie.mem.trajectory_memory import TrajectoryMemory
+
+import config
+import commands
+import control
+import mission
+
+
+PROTOCOL_VERSION = 9 # firmware protocol without the legacy setpoint types
+FIRMWARE_TIMEOUT = 0.5 # seconds without setpoint after which the firmware levels out
+SETPOINT_CHANNEL = 0
+META_CHANNEL = 1
+TYPE_STOP = 0
+TYPE_HOVER = 10
+HL_STOP = 3
+HL_START_TRAJECTORY = 5
+HL_DEFINE_TRAJECTORY = 6
+HL_TAKEOFF = 7
+HL_LAND = 8
+TRAJECTORY_MEMORY_SIZE = 4096 # bytes of trajectory memory of the Crazyflie 2.x
+BENCHMARK_COMMANDS = 50
+SAFETY_TRIALS = 5 # landings per backend, trigger and channel (every one needs a take off)
+CHECK_TRIALS = 2 # landings per trigger of the quick check (about 7 s each)
+FLOOD_PERIOD = 0.001 # seconds between two motion commands during the safety measurement
+
+
+class SimulatedPlatform:
+    """
+    Answers the protocol version requests of the commanders.
+    """
+
+    def get_protocol_version(self):
+        """
+        Returns the simulated firmware protocol version.
+        """
+
+        return PROTOCOL_VERSION
+
+
+class SimulatedParam:
+    """
+    Stores parameter writes (e.g. the estimator reset of the take off).
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def set_value(self, name, value):
+        """
+        Stores the value.
+        """
+
+        self.values[name] = value
+
+
+class SimulatedMemory:
+    """
+    Trajectory memory: stores the uploaded bytes right away.
+    """
+
+    def __init__(self):
+        self.data = bytearray(TRAJECTORY_MEMORY_SIZE)
+        self.trajectory = TrajectoryMemory(0, MemoryElement.TYPE_TRAJ, TRAJECTORY_MEMORY_SIZE, self)
+
+    def get_mems(self, type):
+        """
+        Returns the memories of the type (only the trajectory memory exists).
+        """
+
+        return [self.trajectory] if type == MemoryElement.TYPE_TRAJ else []
+
+    def write(self, memory, addr, data, flush_queue=False):
+        """
+        Writes the data and reports the write as done.
+        """
+
+        if addr + len(data) > len(self.data):
+            memory.write_failed(memory, addr)
+            return
+        self.data[addr:addr + len(data)] = data
+        memory.write_done(memory, addr)
+
+    def pieces(self, offset, count):
+        """
+        Decodes count uploaded pieces into (duration, coefficients) like mission.piece.
+        """
+
+        pieces = []
+        for i in range(count):
+            *values, duration = struct.unpack_from("<33f", self.data, offset + i * mission.PIECE_SIZE)
+            pieces.append((duration, np.array(values).reshape(4, 8)))
+        return pieces
+
+
+class SimulatedCrazyflie:
+    """
+    Connected Crazyflie that executes hover setpoints immediately.
+    Can be used wherever a Crazyflie or a SyncCrazyflie is expected.
+    """
+
+    def __init__(self, clock=control.CLOCK):
+        self.clock = clock
+        self.commander = Commander(self)
+        self.high_level_commander = HighLevelCommander(self)
+        self.platform = SimulatedPlatform()
+        self.param = SimulatedParam()
+        self.mem = SimulatedMemory()
+        self.packet_received = Caller()
+        self.packets = [] # (time, thread name, port, channel, data)
+        self.position = [0.0, 0.0, 0.0]
+        self.yaw = 0.0
+        self.setpoint = None # (vx, vy, yawrate, z) of the active hover setpoint
+        self.time = clock.now()
+        self.setpoint_time = None
+        self.timeouts = 0
+        self.trajectories = {} # id: (offset, number of pieces)
+        self.plan = None # (start time, pieces, offset, time scale, reversed) of the high-level commander
+        self.lock = threading.Lock()
+
+    @property
+    def cf(self):
+        """
+        Allows the simulator to stand in for a SyncCrazyflie.
+        """
+
+        return self
+
+    def is_connected(self):
+        """
+        The simulator is always connected.
+        """
+
+        return True
+
+    def send_packet(self, pk, expected_reply=(), resend=False, timeout=0.2):
+        """
+        Logs the packet and applies it to the simulated state.
+        """
+
+        now = self.clock.now()
+        data = bytes(pk.data)
+        with self.lock:
+            self.packets.append((now, threading.current_thread().name, pk.port, pk.channel, data))
+            self._advance(now)
+            if pk.port == CRTPPort.COMMANDER_GENERIC:
+                self._commander_packet(now, pk.channel, data)
+            elif pk.port == CRTPPort.SETPOINT_HL:
+                self._high_level_packet(now, data)
+
+    def _commander_packet(self, now, channel, data):
+        if channel == META_CHANNEL: # notify setpoint stop
+            self.setpoint = None
+            self.setpoint_time = None
+            return
+
+        if channel != SETPOINT_CHANNEL:
+            return
+
+        if self.setpoint is not None and now - self.setpoint_time > FIRMWARE_TIMEOUT:
+            self.timeouts += 1
+        if data[0] == TYPE_STOP:
+            self.setpoint = None
+            self.setpoint_time = None
+            self.position[2] = 0.0
+        elif data[0] == TYPE_HOVER:
+            self.plan = None # streamed setpoints take over from the high-level commander
+            self.setpoint = struct.unpack("<ffff", data[1:17])
+            self.setpoint_time = now
+            self.position[2] = self.setpoint[3]
+
+    def _high_level_packet(self, now, data):
+        command = data[0]
+        if command in (HL_TAKEOFF, HL_LAND):
+            _, height, yaw, current_yaw, duration = struct.unpack("<Bff?f", data[1:15])
+            pose = self._pose()
+            target = pose.copy()
+            target[2] = height
+            if not current_yaw:
+                target[3] = yaw
+            self._fly(now, [mission.piece(pose, target, duration)])
+        elif command == HL_STOP:
+            self.plan = None
+            self.position[2] = 0.0
+        elif command == HL_DEFINE_TRAJECTORY:
+            trajectory_id, _, _, offset, count = struct.unpack("<BBBIB", data[1:9])
+            self.trajectories[trajectory_id] = (offset, count)
+        elif command == HL_START_TRAJECTORY:
+            _, relative, reverse, trajectory_id, time_scale = struct.unpack("<BBBBf", data[1:9])
+            pieces = self.mem.pieces(*self.trajectories[trajectory_id])
+            shift = np.zeros(4)
+            if relative: # positions are shifted so that the trajectory starts at the current position
+                shift[:3] = self._pose()[:3] - mission.evaluate(pieces, self._duration(pieces) if reverse else 0.0)[:3]
+            self._fly(now, pieces, shift, time_scale, reverse)
+
+    def _fly(self, now, pieces, shift=None, time_scale=1.0, reverse=False):
+        self.setpoint = None
+        self.setpoint_time = None
+        self.plan = (now, pieces, np.zeros(4) if shift is None else shift, time_scale, reverse)
+
+    @staticmethod
+    def _duration(pieces):
+        return sum(duration for duration, _ in pieces)
+
+    def _pose(self):
+        return np.array([*self.position, math.radians(self.yaw)])
+
+    def _advance(self, now):
+        if self.plan is not None:
+            start, pieces, shift, time_scale, reverse = self.plan
+            t = (now - start) / time_scale
+            if reverse:
+                t = max(0.0, self._duration(pieces) - t)
+            x, y, z, yaw = mission.evaluate(pieces, t) + shift
+            self.position = [x, y, z]
+            self.yaw = math.degrees(yaw)
+        elif self.setpoint is not None:
+            vx, vy, yawrate, _ = self.setpoint
+            dt = now - self.time
+            yaw = math.radians(self.yaw)
+            self.position[0] += (vx * math.cos(yaw) - vy * math.sin(yaw)) * dt
+            self.position[1] += (vx * math.sin(yaw) + vy * math.cos(yaw)) * dt
+            self.yaw += yawrate * dt
+        self.time = now
+
+    def pose(self):
+        """
+        Returns the pose (x, y, z, yaw in radians) at the current time of the clock.
+        """
+
+        with self.lock:
+            self._advance(self.clock.now())
+            return self._pose()
+
+    def hover_setpoints(self, start=0):
+        """
+        Returns the hover setpoints sent since packet index start as [(time, thread, setpoint)].
+        """
+
+        with self.lock:
+            packets = self.packets[start:]
+        return [
+            (stamp, thread, struct.unpack("<ffff", data[1:17]))
+            for stamp, thread, port, channel, data in packets
+            if port == CRTPPort.COMMANDER_GENERIC and channel == SETPOINT_CHANNEL and data[0] == TYPE_HOVER
+        ]
+
+
+def command_latency(backend, count=BENCHMARK_COMMANDS, period=0.1):
+    """
+    Flies a take off, count distinct commands and a landing with the backend on the simulator.
+    Returns the latencies from the command call to the matching setpoint packet
+    and the number of firmware timeouts.
+    """
+
+    cf = SimulatedCrazyflie()
+    latencies = []
+    with backend(cf, default_height=config.DEFAULT_HEIGHT) as mc:
+        for i in range(count):
+            vx = (i + 1) / 100 # distinct velocity to find the matching packet
+            start = len(cf.packets)
+            sent = time.perf_counter()
+            mc.start_linear_motion(vx, 0.0, 0.0, 0.0)
+
+            arrival = None
+            while arrival is None and time.perf_counter() - sent < 1.0:
+                for stamp, _, setpoint in cf.hover_setpoints(start):
+                    if abs(setpoint[0] - vx) < 1e-6:
+                        arrival = stamp
+                        break
+                else:
+                    time.sleep(0.0005)
+            if arrival is not None:
+                latencies.append(arrival - sent)
+            time.sleep(period)
+
+    return latencies, cf.timeouts
+
+
+class HeadlessCamera:
+    """
+    Stand-in for the camera that the safety timer closes.
+    """
+
+    def close_cam(self):
+        """
+        Nothing to close.
+        """
+
+
+def safety_latency(backend, queued=True, trigger="request", trials=SAFETY_TRIALS):
+    """
+    Flies with the backend behind a CommandFilter while a command loop floods it with motion commands.
+    The loop is the one of the stream: safety check, then DroneController.determine_state().
+    queued=True uses a CommandQueue, queued=False the old loop (flag, then stop after the command sleep).
+    trigger="request": a land request from another thread (battery supervisor, keyboard) is timed.
+    trigger="timer": the safety timer of the loop expires (hand lost), timed from the moment it expires.
+    Returns the latencies until the first setpoint without velocity reaches the radio.
+    """
+
+    latencies = []
+    for _ in range(trials):
+        cf = SimulatedCrazyflie()
+        controller = control.DroneController()
+        timeout = random.uniform(0.2, 0.4) if trigger == "timer" else math.inf
+        sw = control.Timer(timeout=timeout)
+        with backend(cf, default_height=config.DEFAULT_HEIGHT) as mc:
+            command_filter = commands.CommandFilter(mc)
+            command_queue = commands.CommandQueue(command_filter) if queued else None
+            mc = command_queue or command_filter
+            controller.queue = command_queue
+
+            def loop():
+                i = 0
+                while True:
+                    i += 1
+                    vx = 0.01 + (i % 50) / 100 # never zero
+                    sw.safety_check(controller, HeadlessCamera())
+                    flying = controller.flying
+                    controller.determine_state(mc, (vx, 0.0, 0.0)) # lands once the flag is cleared
+                    if not flying:
+                        return
+                    time.sleep(FLOOD_PERIOD) # stands in for the frame processing
+
+            start = len(cf.packets)
+            sw.reset()
+            thread = threading.Thread(target=loop, name="command loop")
+            thread.start()
+            if trigger == "timer":
+                requested = sw.start_time + sw.t
+            else:
+                time.sleep(random.uniform(0.2, 0.4))
+                requested = time.perf_counter()
+                controller.request_land()
+
+            arrival = None
+            while arrival is None and time.perf_counter() - requested < 1.0:
+                for stamp, _, setpoint in cf.hover_setpoints(start):
+                    if setpoint[0] == 0.0:
+                        arrival = stamp
+                        break
+                else:
+                    time.sleep(0.0005)
+            if arrival is not None:
+                latencies.append(arrival - requested)
+
+            thread.join()
+            if command_queue is not None:
+                command_queue.close()
+            command_filter.close()
+    return latencies
+
+
+def latency_failure(latencies, trials):
+    """
+    Returns why the landings of a queued safety measurement fail config.SAFETY_LATENCY, or None.
+    """
+
+    if len(latencies) < trials:
+        return f"{trials - len(latencies)} landings never arrived"
+    if max(latencies) > config.SAFETY_LATENCY:
+        return f"worst {max(latencies) * 1000:.3f} ms (limit {config.SAFETY_LATENCY * 1000:.0f} ms)"
+    return None
+
+
+def check_safety_latency(backend=commands.DirectCommander, trials=CHECK_TRIALS):
+    """
+    Quick check that needs no one watching: a land request and an expired safety timer
+    must reach the radio through the command queue within config.SAFETY_LATENCY.
+    Returns the failures {trigger: reason} (empty if the check passed).
+    """
+
+    failures = {}
+    for trigger in ("request", "timer"):
+        failure = latency_failure(safety_latency(backend, True, trigger, trials), trials)
+        if failure is not None:
+            failures[trigger] = failure
+    return failures
+
+
+def main():
+    """
+    Prints the command-to-radio latency of both backends
+    and checks the land request latency against config.SAFETY_LATENCY.
+    """
+
+    from cflib.positioning.motion_commander import MotionCommander
+
+    if "--check" in sys.argv[1:]:
+        failures = check_safety_latency()
+        for trigger, failure in failures.items():
+            print(f"❌ Safety check ({trigger}): {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"✅ Safety check: land request and safety timeout within {config.SAFETY_LATENCY * 1000:.0f} ms")
+        return
+
+    backends = {"MotionCommander": MotionCommander, "DirectCommander": commands.DirectCommander}
+    selected = sys.argv[1:] or list(backends)
+    print(f"📶 Command-to-radio latency ({BENCHMARK_COMMANDS} commands, simulator):")
+    for name in selected:
+        latencies, timeouts = command_latency(backends[name])
+        if not latencies:
+            print(f"    - {name:<16} no command arrived")
+            continue
+        latencies.sort()
+        print(
+            f"    - {name:<16} mean {statistics.mean(latencies) * 1000:7.3f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.3f} ms, "
+            f"max {latencies[-1] * 1000:7.3f} ms, "
+            f"{BENCHMARK_COMMANDS - len(latencies)} lost, {timeouts} timeouts")
+
+    print(f"🛬 Land request / safety timeout to radio ({SAFETY_TRIALS} trials each, simulator):")
+    failed = False
+    for name in selected:
+        for trigger, queued in itertools.product(("request", "timer"), (True, False)):
+            latencies = safety_latency(backends[name], queued, trigger)
+            channel = f"{trigger} {'queue' if queued else 'loop'}"
+            if len(latencies) < SAFETY_TRIALS:
+                print(f"    - {name:<16} {channel:<13} {SAFETY_TRIALS - len(latencies)} landings never arrived ❌")
+                failed = True
+                continue
+            line = f"    - {name:<16} {channel:<13} worst {max(latencies) * 1000:7.3f} ms"
+            if queued and latency_failure(latencies, SAFETY_TRIALS) is not None:
+                line += f" ❌ (limit {config.SAFETY_LATENCY * 1000:.0f} ms)"
+                failed = True
+            print(line)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
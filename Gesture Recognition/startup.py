@@ -0,0 +1,170 @@
+"""
+Date: 14.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Loads the radio stack (cflib) on a background thread while the camera starts and the
+      calibration runs, since it is not needed before the calibration is done
+    - Reports the startup time of palm.py / whole_hand.py:
+      import time breakdown (python -X importtime) and time to the first displayed frame
+
+If executed directly, it will:
+    - Print the startup report of the script given as argument (palm or whole_hand)
+"""
+
+import os
+import sys
+import time
+import tempfile
+import importlib
+import threading
+import subprocess
+
+
+RADIO_MODULES = [
+    "cflib.crtp",
+    "cflib.crazyflie",
+    "cflib.crazyflie.syncCrazyflie",
+    "cflib.positioning.motion_commander"
+]
+REPORT_VARIABLE = "GESTURE_STARTUP_REPORT" # set by the report in the started script
+MARK_PREFIX = "⏱️ Startup mark: "
+MARKS = ["camera open", "first frame", "radio ready"]
+TIMEOUT = 30 # seconds to wait for all marks
+TOP = 15 # number of packages in the import breakdown
+HEAVY_IMPORTS = ["numpy", "cv2"] # third-party packages timed as own rows before the script
+
+
+def mark(name):
+    """
+    Reports a startup milestone to the startup report (does nothing in normal runs).
+    """
+
+    if os.environ.get(REPORT_VARIABLE):
+        print(f"{MARK_PREFIX}{name}", flush=True)
+
+
+class RadioLoader:
+    """
+    Imports the radio stack and initializes the drivers on a background thread.
+    wait() blocks until it is done; the modules can then be imported without delay.
+    """
+
+    def __init__(self, modules=None):
+        self.modules = RADIO_MODULES + (modules or [])
+        self.error = None
+        self.duration = None
+        self.thread = threading.Thread(target=self._load, name="radio loader", daemon=True)
+        self.thread.start()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            for name in self.modules:
+                importlib.import_module(name)
+            sys.modules["cflib.crtp"].init_drivers()
+        except Exception as e: # re-raised by wait() on the main thread
+            self.error = e
+        self.duration = time.perf_counter() - start
+        mark("radio ready")
+
+    def wait(self):
+        """
+        Waits for the radio stack and re-raises errors that happened while loading it.
+        """
+
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def import_breakdown(script):
+    """
+    Imports the script in a fresh interpreter with -X importtime.
+    The heavy third-party packages are imported first as their own rows,
+    otherwise their time is charged to the first project module that pulls them in.
+    Returns the total and the cumulative time of the heavy packages and of the script's direct imports
+    [(name, seconds)].
+    """
+
+    statements = "; ".join(f"import {name}" for name in HEAVY_IMPORTS + [script])
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statements],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=False)
+
+    total = 0.0
+    imports = []
+    children = [] # direct imports of the next top-level module (a module is listed after its imports)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2 # two spaces per level
+        seconds = int(cumulative) / 1e6
+        if depth == 1:
+            children.append((name.strip(), seconds))
+        elif depth == 0:
+            if name.strip() in HEAVY_IMPORTS:
+                imports.append((name.strip(), seconds))
+                total += seconds
+            elif name.strip() == script:
+                imports += children
+                total += seconds
+            children = []
+
+    return total, sorted(imports, key=lambda item: item[1], reverse=True)
+
+
+def time_to_marks(script):
+    """
+    Starts the script and measures when its startup marks arrive.
+    Stops the script once all marks arrived (or after TIMEOUT).
+    Returns {mark: seconds since the start of the process}.
+    """
+
+    env = dict(os.environ, **{REPORT_VARIABLE: "1"})
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(
+            [sys.executable, f"{script}.py"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env, stdout=subprocess.PIPE, stderr=errors, text=True)
+
+        timer = threading.Timer(TIMEOUT, process.kill)
+        timer.start()
+        marks = {}
+        try:
+            for line in process.stdout:
+                if line.startswith(MARK_PREFIX):
+                    marks[line[len(MARK_PREFIX):].strip()] = time.perf_counter() - start
+                if all(name in marks for name in MARKS):
+                    break
+        finally:
+            timer.cancel()
+            process.kill()
+            process.wait()
+
+    return marks
+
+
+def main():
+    """
+    Prints the startup report of palm.py or whole_hand.py.
+    """
+
+    script = sys.argv[1] if len(sys.argv) > 1 else "palm"
+    total, imports = import_breakdown(script)
+    print(f"📦 Imports of {script}: {total:.3f} s")
+    for name, seconds in imports[:TOP]:
+        print(f"    - {name:<40} {seconds * 1000:8.1f} ms")
+
+    print("🚀 Startup (camera needed):")
+    marks = time_to_marks(script)
+    for name in MARKS:
+        print(f"    - {name:<40} {f'{marks[name]:.3f} s' if name in marks else 'not reached'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Date: 31.10.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Small stage-based stream for the gesture loop:
+      source -> preprocess -> detect -> filter -> evaluate -> command -> sinks
+    - Every stage measures its own time
+    - Stages run inline or on their own thread with a bounded queue (config.STREAM_THREADED)
+    - Features like the display are switched on and off in config.py
+"""
+
+import time
+import queue
+import threading
+
+import cv2
+
+import autonomy
+import config
+import tracing
+
+
+_END = object()
+
+
+class Packet:
+    """
+    Data of one frame on its way through the stream.
+    """
+
+    def __init__(self, frame, timestamp):
+        self.frame = frame
+        self.time = timestamp
+        self.gray = None
+        self.reused = False
+        self.corners = ()
+        self.ids = None
+        self.tags = ()
+        self.tag_ids = None
+        self.inferred = False
+        self.direction = (0, 0, 0)
+        self.mode = "live"
+        self.cost = 0.0
+
+
+class Stage:
+    """
+    One step of the stream.
+    The function gets a packet and returns it (or None to drop the frame).
+    If budget is set, the time of the stage counts towards the frame cost seen by the governor.
+    """
+
+    def __init__(self, name, func, threaded=False, budget=True):
+        self.name = name
+        self.func = func
+        self.threaded = threaded
+        self.budget = budget
+        self.calls = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def __call__(self, packet):
+        start = time.perf_counter()
+        result = self.func(packet)
+        elapsed = time.perf_counter() - start
+        tracing.complete(self.name, start, elapsed)
+
+        self.calls += 1
+        self.total += elapsed
+        self.worst = max(self.worst, elapsed)
+        if result is not None and self.budget:
+            result.cost += elapsed
+        return result
+
+    def report(self):
+        """
+        Returns the timing of the stage as a readable line.
+        """
+
+        mean = self.total / self.calls if self.calls else 0.0
+        where = "thread" if self.threaded else "inline"
+        return (
+            f"    - {self.name:<10} {where:<6} {self.calls:>6} calls, "
+            f"mean {mean * 1000:6.2f} ms, max {self.worst * 1000:6.2f} ms")
+
+
+class Stream:
+    """
+    Connects a source, processing stages and sinks.
+    Threaded stages consume their input on a worker thread and pass the results on through a queue.
+    Sinks always run on the calling thread (needed for the GUI).
+    """
+
+    def __init__(self, source, stages, sinks, running=lambda: True):
+        self.source = source
+        self.stages = stages
+        self.sinks = sinks
+        self.running = running
+        self.stopped = threading.Event()
+        self.workers = []
+
+    def stop(self):
+        """
+        Ends the stream after the current frame.
+        """
+
+        self.stopped.set()
+
+    def _ticks(self):
+        while self.running() and not self.stopped.is_set():
+            yield None
+
+    def _inline(self, stage, items):
+        for item in items:
+            result = stage(item)
+            if result is not None:
+                yield result
+
+    def _threaded(self, stage, items):
+        results = queue.Queue(maxsize=config.STREAM_QUEUE_SIZE)
+
+        def put(item):
+            # gives up once the stream stopped, nobody reads the queue anymore
+            while not self.stopped.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def worker():
+            try:
+                for result in self._inline(stage, items):
+                    if not put(result):
+                        return
+                put(_END)
+            except BaseException as e:
+                put(e)
+
+        thread = threading.Thread(target=worker, name=stage.name, daemon=True)
+        self.workers.append(thread)
+        thread.start()
+
+        while True:
+            result = results.get()
+            if result is _END:
+                return
+            if isinstance(result, BaseException):
+                raise result
+            yield result
+
+    def run(self):
+        """
+        Runs the stream until it is stopped or running() returns False.
+        """
+
+        items = self._ticks()
+        for stage in [self.source] + self.stages:
+            if stage.threaded:
+                items = self._threaded(stage, items)
+            else:
+                items = self._inline(stage, items)
+
+        try:
+            for packet in items:
+                for sink in self.sinks:
+                    sink(packet)
+                if self.stopped.is_set():
+                    break
+        finally:
+            self.stopped.set()
+            for thread in self.workers: # no stage may still run (e.g. in OpenCV) at exit
+                thread.join(timeout=1.0)
+            if config.STREAM_REPORT:
+                print("⏱️ Stage timings:")
+                for stage in [self.source] + self.stages + self.sinks:
+                    print(stage.report())
+
+
+def gesture_stream(cam, te, controller, sw, mc, flight_recorder=None):
+    """
+    Builds the stream of the gesture loop in palm.py and whole_hand.py.
+    Cameras that detect on their own (process split, pipelined, replay) are used as one source stage.
+    Adds a record sink if a recorder.FlightRecorder is given.
+    The safety timer and the mode switch (autonomy.Autopilot) run on the capture times of the frames,
+    so a replay reproduces their decisions.
+    """
+
+    state = {"direction": (0, 0, 0)}
+    stream = None
+    clock = sw.clock
+    pilot = autonomy.Autopilot()
+
+    def threaded(name):
+        return name in config.STREAM_THREADED
+
+    def read(_):
+        frame = cam.read_frame()
+        return Packet(frame, clock.now())
+
+    def read_and_detect(_):
+        frame, corners, ids = cam.process_frame()
+        packet = Packet(frame, clock.now())
+        packet.corners, packet.ids = corners, ids
+        packet.reused = cam.gate.reused
+        return packet
+
+    def preprocess(packet):
+        packet.gray = cv2.cvtColor(packet.frame, cv2.COLOR_BGR2GRAY)
+        stored = cam.gate.lookup(packet.gray) # the detect stage may store on another thread
+        if stored is not None:
+            packet.reused = True
+            packet.corners, packet.ids = stored
+        return packet
+
+    def detect(packet):
+        if not packet.reused:
+            packet.corners, packet.ids = cam.detect(packet.gray)
+            cam.gate.store(packet.gray, packet.corners, packet.ids)
+        return packet
+
+    def track(packet):
+        packet.tags, packet.tag_ids = te.complete(cam.undistort(packet.corners), packet.ids)
+        packet.inferred = te.inferred
+        return packet
+
+    def evaluate(packet):
+        tag_ids = packet.tag_ids
+        valid = tag_ids is not None and all(_id in tag_ids for _id in config.USED_TAGS)
+        if valid:
+            if not packet.reused: # unchanged frames keep the last velocities
+                state["direction"] = te.update(packet.tags, tag_ids)
+        else:
+            state["direction"] = (0, 0, 0)
+
+        live = pilot.live(packet.ids, valid)
+        packet.direction = pilot.step(live, state["direction"], packet.time)
+        packet.mode = pilot.mode
+        if live or pilot.active:
+            sw.reset(packet.time)
+        else:
+            sw.safety_check(controller, cam, packet.time)
+        return packet
+
+    def command(packet):
+        controller.determine_state(mc, packet.direction)
+        return packet
+
+    def governor(packet):
+        if not packet.reused:
+            cam.frame_done(packet.cost, packet.corners, packet.reused) # the gate may be a frame ahead
+
+    def record(packet):
+        flight_recorder.record_frame(packet.frame, packet.time)
+        flight_recorder.record_detection(packet.corners, packet.ids, packet.time)
+        flight_recorder.record(
+            "evaluation", (packet.direction, packet.inferred, packet.reused), packet.time)
+
+    def display(packet):
+        cam.show_feed(packet.corners, packet.ids, autonomy.draw_mode(packet.frame, packet.mode))
+
+    def controls(packet):
+        key = cam.key()
+        if key != -1 and flight_recorder is not None:
+            flight_recorder.record("key", key, packet.time)
+        if key == ord("q"):
+            cam.close_cam()
+            controller.land()
+            stream.stop()
+
+    # the source waits for the camera, so its time is not processing cost for the governor
+    # (cameras that detect on read run their governor on their own)
+    if cam.detects_on_read:
+        source = Stage("source", read_and_detect, threaded("source"), budget=False)
+        stages = []
+    else:
+        source = Stage("source", read, threaded("source"), budget=False)
+        stages = [
+            Stage("preprocess", preprocess, threaded("preprocess")),
+            Stage("detect", detect, threaded("detect"))
+        ]
+
+    stages += [
+        Stage("track", track, threaded("track")),
+        Stage("evaluate", evaluate, threaded("evaluate")),
+        Stage("command", command, threaded("command"), budget=False)
+    ]
+
+    start = clock.now()
+    sw.reset(start)
+    pilot.reset(start)
+    sinks = [Stage("governor", governor, budget=False)]
+    if flight_recorder is not None:
+        flight_recorder.record("snapshot", {"tags": te.tags_snapshot, "size": cam.size}, start)
+        sinks.append(Stage("record", record, budget=False))
+    if config.STREAM_DISPLAY:
+        sinks.append(Stage("display", display, budget=False))
+    sinks.append(Stage("controls", controls, budget=False))
+
+    stream = Stream(source, stages, sinks, running=lambda: controller.flying)
+    return stream
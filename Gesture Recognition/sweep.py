@@ -0,0 +1,251 @@
+"""
+Date: 11.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Finds good deadzones and velocities without trial flights
+    - Runs the evaluators over labelled flight recordings (see recorder.py) for a grid
+      or a random sample of the constants in config.py
+    - Every evaluator is scored on the recordings of its own tag layout (palm or whole_hand) only
+    - Spreads the configurations over a process pool
+    - Reports accuracy, false-command rate, false travel and compute cost per configuration
+
+Labels:
+    - labels.json in the recording folder, times in seconds since the start of the flight:
+      {"segments": [{"start": 2.0, "end": 4.5, "direction": [1, 0, 0]}, ...]}
+    - direction holds the expected sign of (tilt, altitude, yaw), frames outside a segment are ignored
+
+If executed directly, it will:
+    - Sweep the recordings given as arguments and print the best configurations
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import importlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import config
+import intrinsics
+import recorder
+import replay
+import vision
+
+
+GRID = {
+    "T_DZ": [0.02, 0.04, 0.06, 0.08, 0.1],
+    "A_DZ": [50, 75, 100, 125, 150],
+    "Y_DZ": [0.005, 0.01, 0.02, 0.04],
+    "VT": [0.3, 0.5],
+    "VA": [0.1, 0.2],
+    "VY": [20, 30]
+}
+EVALUATERS = { # evaluator (module of the recorded script): (swept constants, scored axes of (tilt, altitude, yaw))
+    "palm": (["T_DZ", "A_DZ", "Y_DZ", "VT", "VA", "VY"], (0, 1, 2)),
+    "whole_hand": (["T_DZ", "A_DZ", "Y_DZ", "VT", "VA", "VY"], (0, 1, 2))
+}
+
+_sessions = None
+
+
+def load_labels(path):
+    """
+    Returns the labelled segments of a recording as [(start, end, direction)].
+    """
+
+    with open(os.path.join(path, "labels.json"), "r", encoding="utf-8") as file:
+        segments = json.load(file)["segments"]
+    return [(seg["start"], seg["end"], tuple(seg["direction"])) for seg in segments]
+
+
+def prepare_session(path):
+    """
+    Does everything that does not depend on the swept constants once:
+    lens correction, tag inference, validity and the label of every flight frame.
+    """
+
+    session, frames, flight_start, _ = replay.load_session(path)
+    if flight_start is None:
+        raise ValueError(f"{path} contains no flight")
+
+    reader = recorder.FlightReader(path)
+    snapshot = next(reader.records(["snapshot"]))[2]["tags"]
+    reader.close()
+
+    undistorter = intrinsics.create_undistorter(0, *session["size"])
+    segments = load_labels(path)
+
+    flight = [frame for frame in frames if frame[0] >= flight_start]
+    prepared = []
+    for i, (timestamp, corners, ids, reused, _) in enumerate(flight):
+        if undistorter is not None:
+            corners = undistorter.correct(corners)
+        tags, tag_ids, _ = vision.infer_missing_tag(corners, ids, snapshot)
+
+        if tag_ids is None or not all(_id in tag_ids for _id in config.USED_TAGS):
+            state = "invalid"
+        elif reused:
+            state = "reused"
+        else:
+            state = "evaluate"
+
+        elapsed = timestamp - flight_start
+        label = next((d for start, end, d in segments if start <= elapsed < end), None)
+        dt = flight[i + 1][0] - timestamp if i + 1 < len(flight) else 0.0
+        prepared.append((dt, tags, tag_ids, state, label))
+
+    return {
+        "name": os.path.basename(os.path.normpath(path)),
+        "module": session["module"],
+        "snapshot": snapshot,
+        "frames": prepared
+    }
+
+
+def make_jobs(samples=None, seed=0, evaluaters=EVALUATERS):
+    """
+    Returns all (evaluator, constants) combinations of the grid,
+    or a random sample of samples configurations per evaluator.
+    """
+
+    rng = random.Random(seed)
+    jobs = []
+    for evaluater in evaluaters:
+        names = EVALUATERS[evaluater][0]
+        if samples is None:
+            for values in itertools.product(*(GRID[name] for name in names)):
+                jobs.append((evaluater, dict(zip(names, values))))
+        else:
+            for _ in range(samples):
+                jobs.append((evaluater, {name: rng.choice(GRID[name]) for name in names}))
+    return jobs
+
+
+def _init_worker(sessions):
+    global _sessions
+    _sessions = sessions
+
+
+def _make_evaluater(evaluater, snapshot):
+    te = importlib.import_module(evaluater).TagEvaluater()
+    tags = tuple(np.asarray(snapshot[_id]).reshape(1, 4, 2) for _id in config.USED_TAGS)
+    ids = np.array([[_id] for _id in config.USED_TAGS])
+    te.make_snapshot(tags, ids, vision.Camera())
+    return te
+
+
+def run_job(job):
+    """
+    Evaluates one configuration on the sessions recorded with its layout (runs in a worker process).
+    """
+
+    evaluater, constants = job
+    for name, value in constants.items():
+        setattr(config, name, value)
+
+    axes = EVALUATERS[evaluater][1]
+    labelled = correct = false = evaluated = 0
+    travel = [0.0, 0.0, 0.0]
+    cost = 0.0
+
+    for session in _sessions:
+        if session["module"] != evaluater: # the tag layouts of palm and whole_hand differ
+            continue
+        te = _make_evaluater(evaluater, session["snapshot"])
+        direction = (0, 0, 0)
+        for dt, tags, ids, state, label in session["frames"]:
+            if state == "evaluate":
+                start = time.perf_counter()
+                direction = te.update(tags, ids)
+                cost += time.perf_counter() - start
+                evaluated += 1
+            elif state == "invalid":
+                direction = (0, 0, 0)
+
+            if label is None:
+                continue
+
+            labelled += 1
+            signs = np.sign(direction)
+            wrong = [i for i in axes if signs[i] != 0 and signs[i] != label[i]]
+            if all(signs[i] == label[i] for i in axes):
+                correct += 1
+            if wrong:
+                false += 1
+            for i in wrong:
+                travel[i] += abs(direction[i]) * dt
+
+    return {
+        "evaluater": evaluater,
+        **constants,
+        "accuracy": correct / labelled if labelled else 0.0,
+        "false_rate": false / labelled if labelled else 0.0,
+        "false_travel_m": travel[0] + travel[1],
+        "false_yaw_deg": travel[2],
+        "cost_us": cost / evaluated * 1e6 if evaluated else 0.0
+    }
+
+
+def sweep(paths, samples=None, workers=None, seed=0):
+    """
+    Runs the sweep over the recordings in paths.
+    Returns one result dict per configuration.
+    """
+
+    sessions = [prepare_session(path) for path in paths]
+    recorded = [evaluater for evaluater in EVALUATERS if any(s["module"] == evaluater for s in sessions)]
+    jobs = make_jobs(samples, seed, recorded)
+    with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(sessions,)) as pool:
+        return list(pool.map(run_job, jobs, chunksize=max(1, len(jobs) // 256)))
+
+
+def main():
+    """
+    Sweeps the given recordings and prints the best configurations per evaluator.
+    """
+
+    parser = argparse.ArgumentParser(description="Parameter sweep over labelled recordings")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--samples", type=int, default=None, help="random configurations per evaluator")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--out", default=None, help="CSV file for all results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = sweep(args.recordings, args.samples, args.workers, args.seed)
+    print(f"🔍 {len(results)} configurations in {time.perf_counter() - start:.1f} s")
+
+    for evaluater, (names, _) in EVALUATERS.items():
+        ranked = sorted(
+            (r for r in results if r["evaluater"] == evaluater),
+            key=lambda r: (-r["accuracy"], r["false_rate"], r["cost_us"]))
+        if not ranked:
+            continue # no recording of this layout
+        print(f"{evaluater}:")
+        for r in ranked[:args.top]:
+            constants = ", ".join(f"{name}={r[name]}" for name in names)
+            print(
+                f"    - {constants}: accuracy {r['accuracy']:.1%}, false {r['false_rate']:.1%}, "
+                f"travel {r['false_travel_m']:.2f} m / {r['false_yaw_deg']:.0f}°, {r['cost_us']:.0f} µs")
+
+    if args.out is not None:
+        fields = ["evaluater"] + list(GRID) + [
+            "accuracy", "false_rate", "false_travel_m", "false_yaw_deg", "cost_us"]
+        with open(args.out, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Date: 05.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Logs any list of Crazyflie variables at the highest supported rate
+    - Packs the variables into as few LogConfig blocks as the CRTP payload allows
+    - Writes the samples into preallocated ring buffers (one per block)
+    - A background thread flushes the rings into one raw file per column (numpy memmap)
+    - read_telemetry() maps a recording back into numpy arrays without copying
+
+If executed directly, it will:
+    - Record config.TELEMETRY_VARIABLES into config.TELEMETRY_DIR until Ctrl+C
+"""
+
+import os
+import json
+import time
+import threading
+
+import numpy as np
+import cflib.crtp
+from cflib.crazyflie import Crazyflie
+from cflib.crazyflie.log import LogConfig
+from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
+
+import config
+import debug
+import tracing
+
+
+LOG_PAYLOAD = 26 # bytes per log packet (30 bytes CRTP payload - block id - 3 byte timestamp)
+MIN_PERIOD = 10 # fastest logging period in milliseconds
+RING_CAPACITY = 4096 # samples per block kept in memory
+FLUSH_PERIOD = 0.5 # seconds between two flushes of the writer
+
+TYPES = {
+    "uint8_t": np.uint8,
+    "int8_t": np.int8,
+    "uint16_t": np.uint16,
+    "int16_t": np.int16,
+    "uint32_t": np.uint32,
+    "int32_t": np.int32,
+    "FP16": np.float16,
+    "float": np.float32
+}
+
+
+def pack_variables(variables):
+    """
+    Distributes the variables onto as few log blocks as possible (first fit decreasing).
+    Returns a list of blocks, every block is a list of (name, type) tuples.
+    """
+
+    blocks = []
+    sizes = []
+    ordered = sorted(variables, key=lambda var: np.dtype(TYPES[var[1]]).itemsize, reverse=True)
+
+    for name, fetch_as in ordered:
+        size = np.dtype(TYPES[fetch_as]).itemsize
+        for i, used in enumerate(sizes):
+            if used + size <= LOG_PAYLOAD:
+                blocks[i].append((name, fetch_as))
+                sizes[i] += size
+                break
+        else:
+            blocks.append([(name, fetch_as)])
+            sizes.append(size)
+
+    return blocks
+
+
+class BlockRing:
+    """
+    Preallocated ring buffer for the samples of one log block.
+    Columns: host time, Crazyflie timestamp and one column per variable.
+    """
+
+    def __init__(self, variables, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.columns = {
+            "time": np.zeros(capacity, dtype=np.float64),
+            "timestamp": np.zeros(capacity, dtype=np.uint32)
+        }
+        for name, fetch_as in variables:
+            self.columns[name] = np.zeros(capacity, dtype=TYPES[fetch_as])
+        self.head = 0 # number of samples written so far
+        self.flushed = 0 # number of samples saved by the writer
+        self.dropped = 0
+
+    def add(self, host_time, timestamp, data):
+        """
+        Stores one sample (called by the cflib thread of the block).
+        """
+
+        i = self.head % self.capacity
+        self.columns["time"][i] = host_time
+        self.columns["timestamp"][i] = timestamp
+        for name, value in data.items():
+            self.columns[name][i] = value
+        self.head += 1
+
+    def pending(self):
+        """
+        Returns the index range that was not flushed yet.
+        Samples that were overwritten before the writer got to them are counted as dropped.
+        """
+
+        head = self.head
+        if head - self.flushed > self.capacity:
+            self.dropped += head - self.flushed - self.capacity
+            self.flushed = head - self.capacity
+        return self.flushed, head
+
+
+class TelemetryRecorder:
+    """
+    Telemetry subsystem.
+    Other parts of the project can register callbacks to get every sample without own LogConfigs.
+    """
+
+    def __init__(self, variables, path=None, period=MIN_PERIOD):
+        self.blocks = pack_variables(variables)
+        self.rings = [BlockRing(block) for block in self.blocks]
+        self.path = path
+        self.period = period
+        self.log_confs = []
+        self.callbacks = []
+        self.latest = {}
+        self.files = {}
+        self.writer = None
+        self.running = threading.Event()
+
+    def add_callback(self, func):
+        """
+        Registers func(timestamp, data); it is called on the cflib thread for every sample.
+        """
+
+        self.callbacks.append(func)
+
+    def remove_callback(self, func):
+        """
+        Unregisters func; a sample that is being handed out may still reach it.
+        """
+
+        self.callbacks = [callback for callback in self.callbacks if callback != func] # the cflib thread keeps iterating the old list
+
+    def start(self, scf):
+        """
+        Creates and starts one LogConfig per block.
+        Starts the writer thread if a path was given.
+        """
+
+        for i, block in enumerate(self.blocks):
+            log_conf = LogConfig(name=f"Telemetry{i}", period_in_ms=self.period)
+            for name, fetch_as in block:
+                log_conf.add_variable(name, fetch_as)
+            scf.cf.log.add_config(log_conf)
+            log_conf.data_received_cb.add_callback(self._make_callback(self.rings[i]))
+            self.log_confs.append(log_conf)
+
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self.running.set()
+            self.writer = threading.Thread(target=self._write, name="telemetry", daemon=True)
+            self.writer.start()
+
+        for log_conf in self.log_confs:
+            log_conf.start()
+
+    def _make_callback(self, ring):
+        def callback(timestamp, data, log_conf):
+            with tracing.span("log callback", {"block": log_conf.name}):
+                ring.add(time.perf_counter(), timestamp, data)
+                self.latest.update(data)
+                for func in self.callbacks:
+                    func(timestamp, data)
+        return callback
+
+    def stop(self):
+        """
+        Stops logging, flushes the rest and writes the description of the recording.
+        """
+
+        for log_conf in self.log_confs:
+            log_conf.stop()
+
+        if self.writer is not None:
+            self.running.clear()
+            self.writer.join()
+            self._flush()
+            self._write_meta()
+            for file in self.files.values():
+                file.close()
+
+        dropped = sum(ring.dropped for ring in self.rings)
+        if dropped:
+            print(f"⚠️ Telemetry: {dropped} samples dropped (writer too slow)")
+
+    def _write(self):
+        while self.running.is_set():
+            time.sleep(FLUSH_PERIOD)
+            self._flush()
+
+    def _flush(self):
+        for i, ring in enumerate(self.rings):
+            start, end = ring.pending()
+            if start == end:
+                continue
+
+            first = start % ring.capacity
+            last = end % ring.capacity
+            for name, column in ring.columns.items():
+                file = self._file(i, name)
+                if first < last:
+                    file.write(column[first:last].tobytes())
+                else:
+                    file.write(column[first:].tobytes())
+                    file.write(column[:last].tobytes())
+            ring.flushed = end
+
+    def _file(self, block, name):
+        key = (block, name)
+        if key not in self.files:
+            self.files[key] = open(os.path.join(self.path, f"{block}_{name}.bin"), "wb")
+        return self.files[key]
+
+    def _write_meta(self):
+        meta = {"blocks": []}
+        for i, ring in enumerate(self.rings):
+            meta["blocks"].append({
+                "samples": ring.flushed - ring.dropped,
+                "columns": {name: column.dtype.str for name, column in ring.columns.items()}
+            })
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file, indent=4)
+
+
+def read_telemetry(path):
+    """
+    Maps a recording into memory.
+    Returns a dict with one entry per variable: (host times, values).
+    """
+
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as file:
+        meta = json.load(file)
+
+    result = {}
+    for i, block in enumerate(meta["blocks"]):
+        samples = block["samples"]
+        if not samples:
+            continue
+
+        columns = {
+            name: np.memmap(
+                os.path.join(path, f"{i}_{name}.bin"),
+                dtype=np.dtype(dtype), mode="r", shape=(samples,))
+            for name, dtype in block["columns"].items()
+        }
+        for name, values in columns.items():
+            if name not in ("time", "timestamp"):
+                result[name] = (columns["time"], values)
+
+    return result
+
+
+def main():
+    """
+    Initializes Crazyflie connection.
+    Records the configured variables until Ctrl+C is pressed.
+    """
+
+    cflib.crtp.init_drivers()
+    recorder = TelemetryRecorder(
+        config.TELEMETRY_VARIABLES, path=config.TELEMETRY_DIR or "telemetry", period=config.TELEMETRY_PERIOD)
+    print(f"Blocks: {recorder.blocks}")
+
+    try:
+        with SyncCrazyflie(config.MY_URI, cf=Crazyflie(rw_cache="cache")) as scf:
+            recorder.start(scf)
+            try:
+                while True:
+                    print(recorder.latest)
+                    time.sleep(1.0)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                recorder.stop()
+
+    except Exception as e:
+        debug.handle_error(e)
+
+
+if __name__ == "__main__":
+    main()
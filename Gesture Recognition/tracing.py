@@ -0,0 +1,143 @@
+"""
+Date: 16.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Opt-in tracer (config.TRACE_FILE) for the interleaving of all threads:
+      loop stages, capture, cflib radio threads, MotionCommander setpoints, log callbacks, input
+    - Every thread writes into its own buffer, so recording an event takes no lock
+    - Writes Chrome trace JSON at the end of a session (chrome://tracing or ui.perfetto.dev)
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+
+import config
+
+
+_enabled = False
+_origin = 0.0
+_local = threading.local()
+_buffers = [] # (thread id, thread name, events) of every thread that recorded something
+_lock = threading.Lock() # only taken once per thread, when its buffer is created
+
+
+def start():
+    """
+    Starts recording events.
+    """
+
+    global _enabled, _origin
+    _origin = time.perf_counter()
+    _enabled = True
+
+
+def enabled():
+    """
+    Returns True while events are recorded.
+    """
+
+    return _enabled
+
+
+def _events():
+    events = getattr(_local, "events", None)
+    if events is None:
+        events = deque(maxlen=config.TRACE_BUFFER_SIZE) # keeps the latest events
+        _local.events = events
+        thread = threading.current_thread()
+        with _lock:
+            _buffers.append((thread.ident, thread.name, events))
+    return events
+
+
+def complete(name, start, duration, args=None):
+    """
+    Records an event that started at start (time.perf_counter) and took duration seconds.
+    """
+
+    if _enabled:
+        _events().append(("X", name, start, duration, args))
+
+
+def instant(name, args=None):
+    """
+    Records an event without duration.
+    """
+
+    if _enabled:
+        _events().append(("i", name, time.perf_counter(), 0.0, args))
+
+
+class span:
+    """
+    Context manager that records the time of its block.
+    """
+
+    def __init__(self, name, args=None):
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        complete(self.name, self.start, time.perf_counter() - self.start, self.args)
+
+
+def attach(cf):
+    """
+    Traces the radio traffic of a Crazyflie:
+    every sent packet on the sending thread (e.g. the MotionCommander setpoint thread)
+    and every received packet on the cflib receive thread.
+    """
+
+    if not _enabled:
+        return
+
+    send_packet = cf.send_packet
+
+    def traced_send_packet(pk, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return send_packet(pk, *args, **kwargs)
+        finally:
+            complete("send packet", start, time.perf_counter() - start, {"port": pk.port})
+
+    cf.send_packet = traced_send_packet
+    cf.packet_received.add_callback(lambda pk: instant("packet received", {"port": pk.port}))
+
+
+def write(path):
+    """
+    Stops recording and writes all events as Chrome trace JSON.
+    """
+
+    global _enabled
+    _enabled = False
+    pid = os.getpid()
+
+    trace = []
+    with _lock:
+        buffers = list(_buffers)
+    for tid, thread_name, events in buffers:
+        trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+        for phase, name, start, duration, args in list(events):
+            event = {"name": name, "ph": phase, "ts": (start - _origin) * 1e6, "pid": pid, "tid": tid}
+            if phase == "X":
+                event["dur"] = duration * 1e6
+            else:
+                event["s"] = "t"
+            if args:
+                event["args"] = args
+            trace.append(event)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, file)
+    print(f"🧭 Trace with {len(trace)} events written to {path}")
@@ -0,0 +1,531 @@
+"""
+Date: 25.11.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Camera with the aruco detection, the lens correction and the tag recovery
+    - Static-scene gate and governor that keep the detection within the frame budget
+    - Inference of a single missing tag from the calibration snapshot
+    - Calibration of the hand with the text and animations on the feed
+"""
+
+import os
+import sys
+import math
+import time
+import threading
+
+import cv2
+import numpy as np
+
+import config
+import control
+import intrinsics
+import startup
+
+
+class Camera:
+    """
+    Handles the camera and the aruco detection.
+    Cameras that detect on their own (detects_on_read) are used through process_frame only.
+    """
+
+    detects_on_read = False
+
+    def __init__(self):
+        self.cam = None
+        self.aruco_dict = cv2.aruco.getPredefinedDictionary(config.MY_ARUCO_DICT)
+        self.parameters = cv2.aruco.DetectorParameters()
+        self.reference = []
+        self.gate = SceneGate()
+        self.governor = Governor()
+        self.undistorter = None
+        self.size = None
+        self.board = None
+        self.board_points = None
+        self.recovered = 0
+        self.read_time = 0.0 # seconds the last read waited for the camera (not processing cost)
+
+    def open_cam(self, index=0): # 0 for built-in camera
+        """
+        Opens the camera safely
+        Loads the lens correction for this camera and resolution (only once).
+        """
+
+        self.cam = cv2.VideoCapture(index)
+        if not self.cam.isOpened():
+            raise IOError("Cannot open camera")
+        self.gate.clear()
+
+        width = int(self.cam.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cam.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.size = (width, height)
+        if self.undistorter is None or \
+                (self.undistorter.width, self.undistorter.height) != (width, height):
+            self.undistorter = intrinsics.create_undistorter(index, width, height)
+
+    def undistort(self, corners):
+        """
+        Removes the lens distortion from the detected corners (not from the frame).
+        Returns the corners unchanged if the camera was never calibrated.
+        """
+
+        if self.undistorter is None:
+            return corners
+        return self.undistorter.correct(corners)
+
+    def register_board(self, corners, ids):
+        """
+        Registers the tag layout of the calibration snapshot as an aruco board.
+        Allows refineDetectedMarkers to recover tags that were missed by the detection.
+        """
+
+        if ids is None or not all(_id in ids for _id in config.USED_TAGS):
+            return
+
+        id_list = [_id[0] for _id in ids]
+        object_points = []
+        for _id in config.USED_TAGS:
+            tag = corners[id_list.index(_id)].reshape(4, 2)
+            object_points.append(np.hstack((tag, np.zeros((4, 1)))).astype(np.float32))
+
+        self.set_board(object_points)
+
+    def set_board(self, object_points):
+        """
+        Creates the aruco board from the corner positions of the used tags.
+        """
+
+        self.board_points = object_points
+        self.board = cv2.aruco.Board(
+            object_points, self.aruco_dict, np.array(config.USED_TAGS, dtype=np.int32))
+
+    def camera_matrix(self):
+        """
+        Returns the calibrated camera matrix.
+        Falls back to a rough estimate (focal length = frame width) if there is none.
+        """
+
+        if self.undistorter is not None:
+            return self.undistorter.camera_matrix
+
+        width, height = self.size
+        return np.array([
+            [width, 0, width / 2],
+            [0, width, height / 2],
+            [0, 0, 1]], dtype=np.float64)
+
+    def close_cam(self):
+        """
+        Closes the camera and destroys GUI.
+        Prints the number of frames completed by the tag recovery.
+        """
+
+        self.cam.release()
+        cv2.destroyAllWindows()
+        cv2.waitKey(1)
+        if self.board is not None:
+            print(f"🧩 Tag recovery: {self.recovered} frames completed")
+
+    def read_frame(self, out=None):
+        """
+        Reads camera feed (ends script if feed is unsubscriptable).
+        Reads directly into out if an array of the frame size is given.
+        """
+
+        start = time.perf_counter()
+        if out is None:
+            success, frame = self.cam.read()
+        else:
+            success, frame = self.cam.read(out)
+        self.read_time = time.perf_counter() - start
+        if not success:
+            print("Cannot receive frame (stream end?). Exiting ...")
+            sys.exit()
+
+        return frame
+
+    def process_frame(self, out=None):
+        """
+        Reads camera feed.
+        Converts feed to grayscale for better detection results.
+        Reuses the last detection if the tag regions have not changed.
+        Returns important data.
+        """
+
+        frame = self.read_frame(out)
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.gate.unchanged(gray_frame):
+            return frame, self.gate.corners, self.gate.ids
+
+        corners, ids = self.detect(gray_frame)
+        self.gate.store(gray_frame, corners, ids)
+
+        return frame, corners, ids
+
+    def detect(self, gray_frame):
+        """
+        Creates detector instance and detects the tags with the governor settings.
+        Missing tags are searched in the rejected candidates once the board is registered.
+        Corners are always returned in full resolution pixels.
+        """
+
+        corners, ids, recovered = self.detect_tags(gray_frame, self.parameters)
+        self.recovered += recovered
+        return corners, ids
+
+    def detect_tags(self, gray_frame, parameters):
+        """
+        Detection of detect() without touching the camera state, for threads detecting at the same time:
+        every thread passes its own parameters and counts the result itself.
+        Returns the corners, the ids and whether the tag recovery completed the frame.
+        """
+
+        scale, win_size_max = self.governor.setting()
+        parameters.adaptiveThreshWinSizeMax = win_size_max
+        detector = cv2.aruco.ArucoDetector(self.aruco_dict, parameters)
+        if scale != 1.0:
+            detect_frame = cv2.resize(
+                gray_frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            detect_frame = gray_frame
+
+        corners, ids, rejected = detector.detectMarkers(detect_frame)
+        recovered = False
+        if self.board is not None and ids is not None and rejected and \
+                not all(_id in ids for _id in config.USED_TAGS):
+            corners, ids, _, _ = detector.refineDetectedMarkers(
+                detect_frame, self.board, corners, ids, rejected)
+            recovered = all(_id in ids for _id in config.USED_TAGS)
+
+        if scale != 1.0:
+            corners = tuple(corner / scale for corner in corners)
+
+        return corners, ids, recovered
+
+    def frame_done(self, frame_time, corners, reused=None):
+        """
+        Reports the processing time of a frame to the governor.
+        Reused frames are skipped because they did not run a detection.
+        The threaded stream passes reused of its frame, the gate may already hold the next one.
+        """
+
+        if reused is None:
+            reused = self.gate.reused
+        if not reused:
+            self.governor.update(frame_time, corners)
+
+    def show_feed(self, corners, ids, feed_frame):
+        """
+        Displays the feed with the markings of draw_feed().
+        """
+
+        cv2.imshow("Camera Feed", self.draw_feed(corners, ids, feed_frame))
+
+    def draw_feed(self, corners, ids, feed_frame):
+        """
+        Draws the reference marker onto camera feed.
+        Draws detected corners of aruco tags onto a copy of the feed.
+        Returns the mirrored feed.
+        """
+
+        if self.reference:
+            tl = self.reference[0]
+            br = self.reference[1]
+            cv2.rectangle(feed_frame, tl, br, (0, 0, 255), 2)
+
+        if ids is not None and len(ids) != 0:
+            feed_frame = feed_frame.copy()
+            for i, _ in enumerate(ids.flatten()):
+                for corner in corners[i][0]:
+                    x, y = corner
+                    cv2.circle(
+                        feed_frame,
+                        (int(x), int(y)),
+                        radius=5,
+                        color=(0, 0, 255),
+                        thickness=-1)
+
+        return cv2.flip(feed_frame, 1)
+
+    def key(self):
+        """
+        Returns the key pressed in the camera window (-1 if none).
+        """
+
+        return cv2.waitKey(1)
+
+
+class SceneGate:
+    """
+    Cheap change detector for the static-scene case (hand held still to hover).
+    Compares a downsampled version of the tag region with the one of the last detection.
+    The stream checks and stores on different threads, so every access holds the lock.
+    """
+
+    def __init__(self, max_age=config.GATE_MAX_AGE):
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.age = 0
+        self.reused = False
+        self.region = None
+        self.patch = None
+        self.corners = ()
+        self.ids = None
+
+    def clear(self):
+        """
+        Forgets the stored detection, the next frame is always detected.
+        """
+
+        with self.lock:
+            self.age = 0
+            self.reused = False
+            self.region = None
+            self.patch = None
+
+    def unchanged(self, gray_frame):
+        """
+        Returns True if the stored detection can be reused for this frame.
+        A detection is never reused more than max_age times in a row.
+        """
+
+        return self.lookup(gray_frame) is not None
+
+    def lookup(self, gray_frame):
+        """
+        Returns the stored (corners, ids) if they can be reused for this frame, otherwise None.
+        Check and result are taken together, so a concurrent store() cannot mix them up.
+        """
+
+        with self.lock:
+            self.reused = False
+            if self.patch is None or self.age >= self.max_age:
+                return None
+
+            patch = self._downsample(gray_frame)
+            if cv2.mean(cv2.absdiff(patch, self.patch))[0] > config.GATE_THRESHOLD:
+                return None
+
+            self.age += 1
+            self.reused = True
+            return self.corners, self.ids
+
+    def store(self, gray_frame, corners, ids):
+        """
+        Saves a fresh detection result together with its downsampled tag region.
+        Only detections with all used tags are stored, everything else is detected again.
+        """
+
+        with self.lock:
+            self.clear()
+            if ids is None or not all(_id in ids for _id in config.USED_TAGS):
+                return
+
+            self.corners = corners
+            self.ids = ids
+
+            xs = [x for tag in corners for x, _ in tag[0]]
+            ys = [y for tag in corners for _, y in tag[0]]
+            height, width = gray_frame.shape[:2]
+            x1 = max(int(min(xs)) - config.GATE_MARGIN, 0)
+            y1 = max(int(min(ys)) - config.GATE_MARGIN, 0)
+            x2 = min(int(max(xs)) + config.GATE_MARGIN, width)
+            y2 = min(int(max(ys)) + config.GATE_MARGIN, height)
+            self.region = (x1, y1, x2, y2)
+            self.patch = self._downsample(gray_frame)
+
+    def _downsample(self, gray_frame):
+        x1, y1, x2, y2 = self.region
+        roi = gray_frame[y1:y2, x1:x2]
+        return cv2.resize(
+            roi, None, fx=config.GATE_SCALE, fy=config.GATE_SCALE, interpolation=cv2.INTER_AREA)
+
+
+class Governor:
+    """
+    Adapts the processing resolution and detection settings to the frame budget.
+    Level 0 is the best quality, higher levels are cheaper.
+    """
+
+    def __init__(self, period=config.TARGET_PERIOD):
+        self.period = period
+        self.level = 0
+        self.cost = None
+        self.cooldown = 0
+
+    def setting(self):
+        """
+        Returns the scale and threshold window of the current level.
+        """
+
+        return config.GOVERNOR_LEVELS[self.level]
+
+    def update(self, frame_time, corners):
+        """
+        Smooths the measured frame cost.
+        Lowers the quality if the deadline is at risk and the tags stay big enough.
+        Raises it again if there is headroom or the tags get too small.
+        """
+
+        if self.cost is None:
+            self.cost = frame_time
+        else:
+            self.cost = 0.8 * self.cost + 0.2 * frame_time
+
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+
+        tag_size = self._min_tag_size(corners)
+        level = self.level
+
+        if self.level > 0 and tag_size is not None and \
+                tag_size * config.GOVERNOR_LEVELS[self.level][0] < config.MIN_TAG_SIZE:
+            level = self.level - 1
+        elif self.cost > self.period and self.level < len(config.GOVERNOR_LEVELS) - 1:
+            next_scale = config.GOVERNOR_LEVELS[self.level + 1][0]
+            if tag_size is None or tag_size * next_scale >= config.MIN_TAG_SIZE:
+                level = self.level + 1
+        elif self.cost < self.period * config.HEADROOM and self.level > 0:
+            level = self.level - 1
+
+        if level != self.level:
+            self._change(level)
+
+    def _change(self, level):
+        old_scale, old_win = config.GOVERNOR_LEVELS[self.level]
+        scale, win = config.GOVERNOR_LEVELS[level]
+        print(
+            f"⚙️ Governor: level {self.level} -> {level} "
+            f"(scale {old_scale} -> {scale}, window {old_win} -> {win}, "
+            f"cost {self.cost * 1000:.1f} ms / {self.period * 1000:.1f} ms)")
+        self.level = level
+        self.cooldown = config.GOVERNOR_COOLDOWN
+
+    def _min_tag_size(self, corners):
+        if not corners:
+            return None
+        sizes = []
+        for tag in corners:
+            (x1, y1), _, (x3, y3), _ = tag[0]
+            sizes.append(math.sqrt((x3 - x1)**2 + (y3 - y1)**2) / math.sqrt(2))
+        return min(sizes)
+
+
+def infer_missing_tag(corners, ids, snapshot):
+    """
+    Rebuilds a single missing tag from the other three tags.
+    Fits an affine transformation from the snapshot layout to the current corners
+    (least squares, so the result is reproducible) and moves the snapshot corners of the missing tag with it.
+    Returns the completed corners and ids and whether a tag was inferred.
+    """
+
+    if ids is None or snapshot is None:
+        return corners, ids, False
+
+    id_list = [_id[0] for _id in ids]
+    missing = [_id for _id in config.USED_TAGS if _id not in id_list]
+    if len(missing) != 1:
+        return corners, ids, False
+
+    present = [_id for _id in config.USED_TAGS if _id in id_list]
+    src = np.concatenate([snapshot[_id] for _id in present]).astype(np.float32)
+    dst = np.concatenate(
+        [corners[id_list.index(_id)].reshape(4, 2) for _id in present]).astype(np.float32)
+    source = np.hstack((src, np.ones((len(src), 1), dtype=np.float32)))
+    matrix, _, rank, _ = np.linalg.lstsq(source, dst, rcond=None)
+    if rank < 3:
+        return corners, ids, False
+
+    tag = cv2.transform(snapshot[missing[0]].reshape(1, 4, 2).astype(np.float32), matrix.T)
+    corners = tuple(corners) + (tag,)
+    ids = np.vstack((ids, [[missing[0]]])).astype(ids.dtype)
+    return corners, ids, True
+
+
+def calibrate(te, cam, clock=control.CLOCK, flight_recorder=None):
+    """
+    Runs calibration process of the hand.
+    Displays the animation and text of draw_text() on feed.
+    Records the detections and key presses if a recorder.FlightRecorder is given (see replay.py).
+    """
+
+    setpoint = -math.inf
+    cam.open_cam()
+    startup.mark("camera open")
+    mode = None
+    first_frame = True
+    if flight_recorder is not None:
+        module = type(te).__module__
+        if module == "__main__": # palm.py or whole_hand.py started as script
+            module = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+        flight_recorder.record("session", {
+            "size": cam.size, "module": module, "evaluater": type(te).__name__,
+            "queue": config.COMMAND_QUEUE, "runtime": config.RUNTIME})
+
+    while True:
+        frame, corners, ids = cam.process_frame()
+        now = clock.now()
+        key = cam.key()
+        mode = [3, 4]
+        if flight_recorder is not None:
+            flight_recorder.record_detection(corners, ids, now)
+            if key != -1:
+                flight_recorder.record("key", key, now)
+
+        if key == ord("q"):
+            sys.exit()
+
+        if not te.calibrated:
+            if key == ord("s"):
+                setpoint = now
+
+            if now - setpoint < 4:
+                if now - setpoint < 3:
+                    te.make_snapshot(cam.undistort(corners), ids, cam)
+                    cam.register_board(corners, ids)
+                    mode = [1]
+                else:
+                    mode = [2]
+        else:
+            mode = [5]
+
+        if mode == [5]:
+            cam.close_cam()
+            break
+
+        cam.show_feed(corners, ids, draw_text(frame, mode, clock))
+        if first_frame:
+            startup.mark("first frame")
+            first_frame = False
+
+
+def draw_text(frame, mode, clock=control.CLOCK):
+    """
+    Draws text and animations based on current state of the calibration process.
+    """
+
+    flipped_frame = cv2.flip(frame, 1)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    blue = (200, 0, 0)
+
+    lines = [
+        (f"Calibrating{'.' * ((int(clock.wall() / 0.75) % 3) + 1)}", (0, 255, 0), 2),
+        ("Failed. Try again.", (0, 0, 255), 2),
+        ("Position your hand 20cm away from the camera in the middle of the screen.", blue, 2),
+        ("Press 's' when you see red dots on all tag corners.", blue, 1)
+    ]
+
+    y_offset = 10
+
+    for _, i in enumerate(mode):
+        text, color, thickness = lines[i-1]
+        text_size = cv2.getTextSize(text, font, 1.0, thickness)[0]
+        x = (flipped_frame.shape[1] - text_size[0]) // 2
+        y = y_offset + text_size[1]
+        cv2.putText(flipped_frame, text, (x, y), font, 1.0, color, thickness)
+        y_offset = y + 10
+
+    return cv2.flip(flipped_frame, 1)
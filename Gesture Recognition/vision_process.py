@@ -0,0 +1,247 @@
+"""
+Date: 27.10.2025
+
+Author: Nelio Gautschi
+
+Purpose:
+    - Optional process split between vision and control (config.PROCESS_SPLIT)
+    - Capture worker: reads frames directly into a shared memory ring and detects the tags
+    - Control side: RemoteCamera with the same interface as vision.Camera
+    - Sequence numbers detect torn (overwritten while reading) and stale reads
+"""
+
+import sys
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+import config
+import intrinsics
+import vision
+
+
+SLOTS = 4 # number of frames in the ring
+MAX_TAGS = 16 # max. number of detected tags stored per frame
+READ_TIMEOUT = 2.0 # seconds without a new frame until the worker counts as dead
+
+
+class FrameRing:
+    """
+    Ring of frame slots in one shared memory block.
+    Every slot is protected by a sequence number (seqlock):
+        - odd: the worker is writing the slot
+        - even: the slot holds frame number (seq / 2 - 1)
+    """
+
+    def __init__(self, width, height, name=None):
+        self.width = width
+        self.height = height
+        self.layout = [
+            ("latest", np.int64, (1,)),
+            ("seq", np.int64, (SLOTS,)),
+            ("meta", np.int32, (SLOTS, 2)), # number of tags, reused flag
+            ("ids", np.int32, (SLOTS, MAX_TAGS, 1)),
+            ("corners", np.float32, (SLOTS, MAX_TAGS, 1, 4, 2)),
+            ("frames", np.uint8, (SLOTS, height, width, 3))
+        ]
+
+        size = sum(self._nbytes(dtype, shape) for _, dtype, shape in self.layout)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        offset = 0
+        for field, dtype, shape in self.layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset)
+            setattr(self, field, view)
+            offset += self._nbytes(dtype, shape)
+
+        if name is None:
+            self.latest[0] = -1
+            self.seq[:] = 0
+
+    def _nbytes(self, dtype, shape):
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return (nbytes + 7) // 8 * 8 # keep every field 8 byte aligned
+
+    def close(self):
+        """
+        Releases the numpy views and detaches from the shared memory.
+        """
+
+        for field, _, _ in self.layout:
+            setattr(self, field, None)
+        self.shm.close()
+
+
+def capture_worker(index, board_points, conn, stop):
+    """
+    Runs in its own process.
+    Opens the camera, creates the ring and sends its name to the control process.
+    Writes every frame and its detection result into the next slot of the ring.
+    """
+
+    cam = vision.Camera()
+    cam.open_cam(index)
+    if board_points is not None:
+        cam.set_board(board_points)
+
+    success, frame = cam.cam.read()
+    if not success:
+        conn.send(None)
+        return
+    height, width = frame.shape[:2]
+    ring = FrameRing(width, height)
+    conn.send((ring.shm.name, width, height))
+
+    n = 0
+    try:
+        while not stop.is_set():
+            slot = n % SLOTS
+            frame_start = time.perf_counter()
+
+            ring.seq[slot] = 2 * n + 1
+            frame, corners, ids = cam.process_frame(out=ring.frames[slot])
+            if frame is not ring.frames[slot]: # camera delivered another size or type
+                ring.frames[slot] = frame
+            count = 0 if ids is None else min(len(ids), MAX_TAGS)
+            for i in range(count):
+                ring.ids[slot][i] = ids[i]
+                ring.corners[slot][i] = corners[i]
+            ring.meta[slot] = (count, int(cam.gate.reused))
+            ring.seq[slot] = 2 * n + 2
+            ring.latest[0] = n
+
+            cam.frame_done(time.perf_counter() - frame_start - cam.read_time, corners) # without the capture wait
+            n += 1
+    finally:
+        cam.cam.release()
+        ring.close()
+        ring.shm.unlink()
+        try:
+            conn.send(cam.recovered) # counted in this process, reported by the control side
+        except OSError:
+            pass
+
+
+class RemoteCamera(vision.Camera):
+    """
+    Control side of the process split.
+    Reads the newest frame and detection result from the ring instead of the camera.
+    """
+
+    detects_on_read = True
+
+    def __init__(self):
+        super().__init__()
+        self.ring = None
+        self.worker = None
+        self.stop = None
+        self.conn = None
+        self.last = -1
+        self.torn = 0
+        self.stale = 0 # reads that found no new frame and had to wait
+        self.skipped = 0 # frames overwritten before they were read
+
+    def open_cam(self, index=0):
+        """
+        Starts the capture worker and attaches to its ring.
+        The registered board is handed to the worker for the tag recovery.
+        """
+
+        ctx = mp.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self.stop = ctx.Event()
+        self.worker = ctx.Process(
+            target=capture_worker,
+            args=(index, self.board_points, child_conn, self.stop),
+            daemon=True)
+        self.worker.start()
+
+        self.conn = parent_conn
+        info = parent_conn.recv()
+        if info is None:
+            raise IOError("Cannot open camera")
+        name, width, height = info
+
+        self.ring = FrameRing(width, height, name=name)
+        self.last = -1
+        self.gate.clear()
+        self.size = (width, height)
+        if self.undistorter is None or \
+                (self.undistorter.width, self.undistorter.height) != (width, height):
+            self.undistorter = intrinsics.create_undistorter(index, width, height)
+
+    def close_cam(self):
+        """
+        Stops the worker and destroys GUI.
+        Prints the torn and stale reads and the frames completed by the tag recovery of the worker.
+        """
+
+        if self.worker is None:
+            return
+
+        self.stop.set()
+        if self.conn.poll(1.0):
+            self.recovered = self.conn.recv()
+        self.worker.join(timeout=1.0)
+        self.worker = None
+        self.ring.close()
+        self.ring = None
+        cv2.destroyAllWindows()
+        cv2.waitKey(1)
+        print(
+            f"🔀 Process split: {self.torn} torn reads, {self.stale} reads waited for a frame, "
+            f"{self.skipped} frames skipped, {self.recovered} frames recovered")
+
+    def process_frame(self, out=None):
+        """
+        Waits for a frame newer than the last one (stale reads are skipped).
+        Copies the slot and checks its sequence number afterwards (torn reads are retried).
+        Returns important data.
+        """
+
+        deadline = time.perf_counter() + READ_TIMEOUT
+        waited = False
+        while True:
+            n = int(self.ring.latest[0])
+            if n <= self.last:
+                if not waited: # counted once per read, not per poll
+                    self.stale += 1
+                    waited = True
+                if time.perf_counter() > deadline or not self.worker.is_alive():
+                    print("Cannot receive frame (stream end?). Exiting ...")
+                    sys.exit()
+                time.sleep(0.001)
+                continue
+
+            slot = n % SLOTS
+            seq = int(self.ring.seq[slot])
+            if seq != 2 * n + 2:
+                self.torn += 1
+                continue
+
+            count, reused = self.ring.meta[slot]
+            frame = np.empty_like(self.ring.frames[slot]) if out is None else out
+            np.copyto(frame, self.ring.frames[slot])
+            ids = self.ring.ids[slot][:count].copy()
+            corners = tuple(self.ring.corners[slot][:count].copy())
+
+            if int(self.ring.seq[slot]) != seq:
+                self.torn += 1
+                continue
+
+            if self.last >= 0:
+                self.skipped += n - self.last - 1
+            self.last = n
+            self.gate.reused = bool(reused)
+            return frame, corners, (ids if count else None)
+
+    def frame_done(self, frame_time, corners, reused=None):
+        """
+        The governor runs in the capture worker.
+        """
@@ -9,17 +9,11 @@ Purpose:
 
 """
 
-import time
 import math
 
-import cv2
-import cflib.crtp
-from cflib.crazyflie import Crazyflie
-from cflib.crazyflie.syncCrazyflie import SyncCrazyflie
-from cflib.positioning.motion_commander import MotionCommander
-
 import config
-import debug
+import flight
+import vision
 
 
 class TagEvaluater:
@@ -31,6 +25,8 @@ class TagEvaluater:
         self.ids = None
         self.tags = []
         self.calibrated = False
+        self.inferred = False
+        self.tags_snapshot = None
         self.distance_snapshot = (None, None)
         self.distance = None
         self.area_snapshot = None
@@ -124,6 +120,15 @@ class TagEvaluater:
 
             self.tags.append(tag_as_2d_array)
 
+    def complete(self, tags, ids):
+        """
+        Rebuilds a single missing tag from the snapshot layout.
+        Stores in self.inferred if the result is based on three tags only.
+        """
+
+        tags, ids, self.inferred = vision.infer_missing_tag(tags, ids, self.tags_snapshot)
+        return tags, ids
+
     def make_snapshot(self, tags, ids, cam):
         """
         Initiates the calibration process.
@@ -131,6 +136,8 @@ class TagEvaluater:
         """
 
         if ids is not None and all(_id in ids for _id in config.USED_TAGS):
+            id_list = [_id[0] for _id in ids]
+            self.tags_snapshot = {_id: tags[id_list.index(_id)].reshape(4, 2) for _id in id_list}
             _ = self.update(tags, ids)
             self.distance_snapshot = self.distance
 
@@ -138,7 +145,7 @@ class TagEvaluater:
             self.area_snapshot = dict(zip(self.ids, areas))
 
             assigned_tags = dict(zip(self.ids, self.tags))
-            self.y_middle = (assigned_tags[2] + assigned_tags[4]) / 2
+            self.y_middle = (self._get_middle(assigned_tags[2])[1] + self._get_middle(assigned_tags[4])[1]) / 2
 
             reference_marker = self.tags[self.ids.index(4)]
             tl = reference_marker[0]
@@ -166,47 +173,10 @@ class TagEvaluater:
 
 def main():
     """
-    Initiates all the classes.
-    Catches errors.
-    Connects to crazyflie with the MotionCommander
+    Flies with the TagEvaluater of this file (see flight.py).
     """
 
-    cam = config.Camera()
-    sw = config.Timer()
-    te = TagEvaluater()
-    controller = config.DroneController()
-
-    config.calibrate(te, cam)
-
-    cflib.crtp.init_drivers()
-    debug.main("deck")
-
-    try:
-        with SyncCrazyflie(config.MY_URI, cf=Crazyflie(rw_cache="cache")) as scf:
-            scf.cf.platform.send_arming_request(True)
-            time.sleep(1.0)
-            with MotionCommander(scf, default_height=config.DEFAULT_HEIGHT) as mc:
-                cam.open_cam()
-                sw.reset()
-                while controller.flying:
-                    if cv2.waitKey(1) == ord("q"):
-                        cam.close_cam()
-                        break
-
-                    frame, corners, ids = cam.process_frame()
-
-                    if ids is not None and all(_id in ids for _id in config.USED_TAGS):
-                        sw.reset()
-                        direction = te.update(corners, ids)
-                    else:
-                        direction = (0, 0, 0)
-                        sw.safety_check(controller, cam)
-
-                    controller.determine_state(mc, direction)
-                    cam.show_feed(corners, ids, frame)
-
-    except Exception as e:
-        debug.handle_error(e)
+    flight.main(TagEvaluater)
 
 
 if __name__ == "__main__":